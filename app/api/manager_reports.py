@@ -753,45 +753,54 @@ def sales_trend(
     db: Session = Depends(get_db),
 ) -> dict:
     """Sales of a specific product (or all products) grouped by period."""
-    from collections import defaultdict
+    from functools import cache
+
     from app.services.reporting.common import default_period
     from app.services.reporting.repository import sales_items_between
 
     period = default_period(from_date, to_date)
     rows = sales_items_between(db, period.from_date, period.to_date, currency=currency)
 
-    by_period: dict[str, dict[str, float | int]] = defaultdict(
-        lambda: {"quantity": 0.0, "sales_amount": 0, "invoice_count": 0}
-    )
-    seen_invoices: dict[str, set] = defaultdict(set)
+    wanted = product_name.lower() if product_name else None
 
-    for item, inv in rows:
-        name = (item.product_name or "").strip()
-        if product_name and product_name.lower() not in name.lower():
-            continue
+    # Product names and issue dates repeat across items: decide each distinct
+    # name and bucket each distinct date once.
+    @cache
+    def name_matches(name: str | None) -> bool:
+        return wanted in (name or "").strip().lower()
 
-        d = inv.issue_date
+    @cache
+    def period_key(d: date) -> str:
         if granularity == "weekly":
-            key = d.strftime("%Y-W%W")
-        elif granularity == "quarterly":
+            return d.strftime("%Y-W%W")
+        if granularity == "quarterly":
             q = (d.month - 1) // 3 + 1
-            key = f"{d.year}-Q{q}"
-        elif granularity == "seasonal":
+            return f"{d.year}-Q{q}"
+        if granularity == "seasonal":
             month = d.month
             season = "Spring" if month in (3, 4, 5) else "Summer" if month in (6, 7, 8) else "Autumn" if month in (9, 10, 11) else "Winter"
-            key = f"{d.year}-{season}"
-        else:
-            key = d.strftime("%Y-%m")
+            return f"{d.year}-{season}"
+        return d.strftime("%Y-%m")
 
-        by_period[key]["quantity"] += float(item.quantity or 0)
-        by_period[key]["sales_amount"] += int(item.line_total or 0)
-        if inv.id not in seen_invoices[key]:
-            seen_invoices[key].add(inv.id)
-            by_period[key]["invoice_count"] += 1
+    # period key -> [quantity, sales_amount, invoice ids]
+    by_period: dict[str, list] = {}
 
-    periods = []
-    for k in sorted(by_period.keys()):
-        periods.append({"period": k, **by_period[k]})
+    for item, inv in rows:
+        if wanted and not name_matches(item.product_name):
+            continue
+
+        key = period_key(inv.issue_date)
+        acc = by_period.get(key)
+        if acc is None:
+            acc = by_period[key] = [0.0, 0, set()]
+        acc[0] += float(item.quantity or 0)
+        acc[1] += int(item.line_total or 0)
+        acc[2].add(inv.id)
+
+    periods = [
+        {"period": k, "quantity": qty, "sales_amount": amount, "invoice_count": len(invoice_ids)}
+        for k, (qty, amount, invoice_ids) in sorted(by_period.items())
+    ]
 
     return {
         "report_type": "sales_trend",
@@ -900,7 +909,7 @@ def list_journal_entries(
 
 @router.patch("/journal/{transaction_id}", response_model=TransactionRead)
 def edit_journal_entry(transaction_id: UUID, payload: TransactionUpdate, db: Session = Depends(get_db)) -> TransactionRead:
-    from app.api.transactions import _load_transaction_with_lines, _transaction_to_read, _validate_balanced_lines, _get_account_by_code
+    from app.api.transactions import _accounts_by_code, _load_transaction_with_lines, _transaction_to_read, _validate_balanced_lines, _get_account_by_code
     from app.models.entity import Entity, TransactionEntity
 
     t = db.get(Transaction, transaction_id)
@@ -917,8 +926,9 @@ def edit_journal_entry(transaction_id: UUID, payload: TransactionUpdate, db: Ses
         for ln in list(t.lines or []):
             db.delete(ln)
         db.flush()
+        accounts = _accounts_by_code(db, (line.account_code for line in payload.lines))
         for line in payload.lines:
-            acc = _get_account_by_code(db, line.account_code)
+            acc = _get_account_by_code(db, line.account_code, accounts)
             db.add(
                 TransactionLine(
                     transaction_id=t.id,
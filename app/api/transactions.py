@@ -6,6 +6,7 @@ import logging
 import re
 import time as _time
 import uuid
+from collections.abc import Iterable
 from datetime import date, timedelta
 from pathlib import Path
 from uuid import UUID
@@ -184,9 +185,21 @@ def _load_attachments(db: Session, attachment_ids: list[UUID]) -> list[Transacti
     return [by_id[i] for i in attachment_ids if i in by_id]
 
 
-def _get_account_by_code(db: Session, code: str) -> Account:
+def _accounts_by_code(db: Session, codes: Iterable[str]) -> dict[str, Account]:
+    """Every account named in ``codes``, fetched with one query, for handing to
+    ``_get_account_by_code`` across a batch of lines."""
+    wanted = {code.strip() for code in codes}
+    if not wanted:
+        return {}
+    return {acc.code: acc for acc in db.execute(select(Account).where(Account.code.in_(wanted))).scalars()}
+
+
+def _get_account_by_code(db: Session, code: str, accounts: dict[str, Account] | None = None) -> Account:
     code = code.strip()
-    acc = db.execute(select(Account).where(Account.code == code)).scalars().one_or_none()
+    if accounts is not None:
+        acc = accounts.get(code)
+    else:
+        acc = db.execute(select(Account).where(Account.code == code)).scalars().one_or_none()
     if not acc:
         raise HTTPException(status_code=400, detail=f"Account not found: {code}")
     return acc
@@ -2318,8 +2331,9 @@ def _create_transaction_from_payload(db: Session, payload: TransactionCreate) ->
     )
     db.add(transaction)
     db.flush()
+    accounts = _accounts_by_code(db, (line.account_code for line in lines_data))
     for line in lines_data:
-        acc = _get_account_by_code(db, line.account_code)
+        acc = _get_account_by_code(db, line.account_code, accounts)
         db.add(
             TransactionLine(
                 transaction_id=transaction.id,
@@ -2396,8 +2410,9 @@ def update_transaction(
         for line in t.lines:
             db.delete(line)
         db.flush()
+        accounts = _accounts_by_code(db, (line.account_code for line in payload.lines))
         for line in payload.lines:
-            acc = _get_account_by_code(db, line.account_code)
+            acc = _get_account_by_code(db, line.account_code, accounts)
             db.add(
                 TransactionLine(
                     transaction_id=t.id,
@@ -2469,6 +2484,7 @@ def import_transactions(
 ) -> ImportTransactionsResponse:
     """Import multiple transactions in one request. Each transaction must have balanced lines (sum debits = sum credits)."""
     ids: list[UUID] = []
+    accounts = _accounts_by_code(db, (line.account_code for imp in payload.transactions for line in imp.lines))
     for imp in payload.transactions:
         total_debit = sum(l.debit for l in imp.lines)
         total_credit = sum(l.credit for l in imp.lines)
@@ -2485,7 +2501,7 @@ def import_transactions(
         db.add(t)
         db.flush()
         for line in imp.lines:
-            acc = _get_account_by_code(db, line.account_code)
+            acc = _get_account_by_code(db, line.account_code, accounts)
             db.add(
                 TransactionLine(
                     transaction_id=t.id,
@@ -7,7 +7,7 @@ from sqlalchemy.orm import Session
 
 from app.schemas.manager_report import CashFlowResponse
 from app.services.reporting.common import default_period
-from app.services.reporting.financial_statement_service import build_cash_flow_statement
+from app.services.reporting.financial_statement_service import FinancialStatementService
 
 
 class CashFlowService:
@@ -15,7 +15,7 @@ class CashFlowService:
         self.db = db
 
     def statement(self, from_date: date | None = None, to_date: date | None = None, currency: str | None = None) -> CashFlowResponse:
-        return build_cash_flow_statement(self.db, from_date=from_date, to_date=to_date, currency=currency)
+        return FinancialStatementService(self.db).cash_flow_statement(from_date=from_date, to_date=to_date, currency=currency)
 
     def cash_flow_periods(self, from_date: date | None = None, to_date: date | None = None, granularity: str = "monthly", currency: str | None = None) -> dict:
         """Return cash inflows and outflows grouped by period."""
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import date, timedelta
+from functools import lru_cache
 
 
 ASSET = "ASSET"
@@ -21,6 +22,24 @@ ACCOUNT_TYPE_FA = {
 }
 
 
+_TYPE_BY_HEAD = {
+    "0": ASSET,
+    "1": ASSET,
+    "2": LIABILITY,
+    "3": EQUITY,
+    "4": REVENUE,
+    **{d: EXPENSE for d in "56789"},
+}
+# Statement nature by the first one or two characters of a code. Two-digit
+# keys let "91" (memo) override its head digit without a startswith chain.
+_TYPE_BY_PREFIX = {
+    **_TYPE_BY_HEAD,
+    **{h + d: nature for h, nature in _TYPE_BY_HEAD.items() for d in "0123456789"},
+    # Iranian memo / off-balance-sheet accounts — kept for back-compat.
+    "91": OTHER,
+}
+
+
 def classify_account_code(code: str) -> str:
     """Classify an account code to its statement nature. Handles both the
     Iranian chart (11-15 assets, 21-24 liab, 31-33 equity, 41-43 revenue,
@@ -28,23 +47,10 @@ def classify_account_code(code: str) -> str:
     1xxx current assets, 2xxx creditors, 3xxx capital, 4xxx turnover,
     5xxx COGS, 7-8xxx overheads/finance, 9xxx tax)."""
     c = (code or "").strip()
-    if not c:
-        return OTHER
-    # Iranian memo / off-balance-sheet accounts — kept for back-compat.
-    if c.startswith("91"):
-        return OTHER
-    head = c[0]
-    if head in ("0", "1"):
-        return ASSET
-    if head == "2":
-        return LIABILITY
-    if head == "3":
-        return EQUITY
-    if head == "4":
-        return REVENUE
-    if head in ("5", "6", "7", "8", "9"):
-        return EXPENSE
-    return OTHER
+    nature = _TYPE_BY_PREFIX.get(c[:2])
+    if nature is not None:
+        return nature
+    return _TYPE_BY_PREFIX.get(c[:1], OTHER)
 
 
 def balance_from_turnovers(account_type: str, debit_turnover: int, credit_turnover: int) -> int:
@@ -71,35 +77,45 @@ class ParsedRange:
     to_date: date
 
 
-def default_period(from_date: date | None, to_date: date | None) -> ParsedRange:
-    today = date.today()
+@lru_cache(maxsize=256)
+def _default_period_cached(from_date: date | None, to_date: date | None, today: date) -> tuple[date, date]:
     if to_date is None:
         to_date = today
     if from_date is None:
         from_date = to_date.replace(day=1)
     if from_date > to_date:
         from_date, to_date = to_date, from_date
-    return ParsedRange(from_date=from_date, to_date=to_date)
+    return from_date, to_date
 
 
-def period_for_keyword(keyword: str, *, today: date | None = None) -> ParsedRange | None:
-    now = today or date.today()
-    k = (keyword or "").strip().lower()
+def default_period(from_date: date | None, to_date: date | None) -> ParsedRange:
+    return ParsedRange(*_default_period_cached(from_date, to_date, date.today()))
+
+
+@lru_cache(maxsize=256)
+def _period_for_keyword_cached(k: str, now: date) -> tuple[date, date] | None:
     if k in ("today", "امروز"):
-        return ParsedRange(now, now)
+        return now, now
     if k in ("yesterday", "دیروز"):
         d = now - timedelta(days=1)
-        return ParsedRange(d, d)
+        return d, d
     if k in ("this month", "این ماه"):
-        return ParsedRange(now.replace(day=1), now)
+        return now.replace(day=1), now
     if k in ("last month", "ماه قبل", "ماه گذشته"):
         first_this = now.replace(day=1)
         last_prev = first_this - timedelta(days=1)
-        return ParsedRange(last_prev.replace(day=1), last_prev)
+        return last_prev.replace(day=1), last_prev
     if k in ("this year", "امسال", "از اول سال"):
-        return ParsedRange(date(now.year, 1, 1), now)
+        return date(now.year, 1, 1), now
     if k in ("last week", "هفته قبل", "هفته گذشته"):
-        return ParsedRange(now - timedelta(days=7), now)
+        return now - timedelta(days=7), now
     if k in ("last 3 months", "three months", "سه ماه اخیر"):
-        return ParsedRange(now - timedelta(days=90), now)
+        return now - timedelta(days=90), now
     return None
+
+
+def period_for_keyword(keyword: str, *, today: date | None = None) -> ParsedRange | None:
+    # The caches hold plain tuples; ParsedRange is mutable, so each caller
+    # gets a fresh instance.
+    bounds = _period_for_keyword_cached((keyword or "").strip().lower(), today or date.today())
+    return ParsedRange(*bounds) if bounds else None
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
-from collections import defaultdict
+from collections.abc import Iterable, Sequence
 from dataclasses import dataclass
 from datetime import date
+from itertools import groupby
+from operator import attrgetter
 from uuid import UUID
 
 from sqlalchemy.orm import Session
@@ -31,10 +33,16 @@ from app.services.reporting.common import (
     default_period,
     statement_sign_value,
 )
-from app.services.reporting.repository import account_turnovers_between, account_turnovers_upto, list_accounts
+from app.services.reporting.repository import (
+    account_turnovers_between,
+    account_turnovers_upto,
+    list_accounts,
+    list_accounts_for_income,
+)
+from app.services.reporting.statement_cache import cached_statement
 
 
-@dataclass
+@dataclass(slots=True)
 class AccountBalance:
     debit: int = 0
     credit: int = 0
@@ -48,37 +56,46 @@ def _build_balance_map(turnovers: list[tuple[UUID, int, int]]) -> dict[UUID, Acc
 
 
 def _rollup_account_tree(accounts: list[Account], amounts: dict[UUID, int]) -> dict[UUID, int]:
-    children: dict[UUID | None, list[Account]] = defaultdict(list)
-    for acc in accounts:
-        children[acc.parent_id].append(acc)
-
-    totals: dict[UUID, int] = {}
-
-    def walk(node: Account, visited: set[UUID] | None = None) -> int:
-        if visited is None:
-            visited = set()
-        if node.id in visited:
-            return 0  # cycle detected — break infinite recursion
-        visited.add(node.id)
-        total = int(amounts.get(node.id, 0))
-        for ch in children.get(node.id, []):
-            total += walk(ch, visited)
-        totals[node.id] = total
-        return total
-
-    for root in children.get(None, []):
-        walk(root)
-    return totals
-
-
-def _node_from_account(account: Account, total_balance: int, type_override: str | None = None) -> StatementAccountNode:
-    acc_type = type_override or classify_account_code(account.code)
-    return StatementAccountNode(
+    """Subtree totals for every account reachable from a root. Works on dense
+    integer indices; accounts caught in a parent cycle are never reached."""
+    index = {acc.id: i for i, acc in enumerate(accounts)}
+    parent = [-1] * len(accounts)
+    children: list[list[int]] = [[] for _ in accounts]
+    roots: list[int] = []
+    for i, acc in enumerate(accounts):
+        if acc.parent_id is None:
+            roots.append(i)
+            continue
+        p = index.get(acc.parent_id)
+        if p is not None:
+            parent[i] = p
+            children[p].append(i)
+
+    totals = [int(amounts.get(acc.id, 0)) for acc in accounts]
+    reached = [False] * len(accounts)
+    order: list[int] = []
+    stack = roots[::-1]
+    while stack:
+        i = stack.pop()
+        if reached[i]:
+            continue
+        reached[i] = True
+        order.append(i)
+        stack.extend(children[i])
+    # Pre-order reversed visits every child before its parent.
+    for i in reversed(order):
+        if parent[i] >= 0:
+            totals[parent[i]] += totals[i]
+    return {accounts[i].id: totals[i] for i in order}
+
+
+def _node_from_account(account: Account, total_balance: int, acc_type: str, label_fa: str | None) -> StatementAccountNode:
+    return StatementAccountNode.model_construct(
         account_id=account.id,
         account_code=account.code,
         account_name=account.name,
         account_type=acc_type,
-        label_fa=ACCOUNT_TYPE_FA.get(acc_type),
+        label_fa=label_fa,
         balance=total_balance,
         debit_turnover=0,
         credit_turnover=0,
@@ -86,21 +103,34 @@ def _node_from_account(account: Account, total_balance: int, type_override: str
     )
 
 
+_ROOT_PARENT = UUID(int=0)
+
+
+def _sort_for_tree(accounts: list[Account]) -> list[Account]:
+    """Order accounts so each parent's children form one contiguous run, sorted by code."""
+    return sorted(accounts, key=lambda a: (a.parent_id or _ROOT_PARENT, a.code))
+
+
 def _build_section_tree(accounts: list[Account], totals: dict[UUID, int], section_type: str) -> list[StatementAccountNode]:
-    by_parent: dict[UUID | None, list[Account]] = defaultdict(list)
-    for acc in accounts:
-        by_parent[acc.parent_id].append(acc)
-    for _, arr in by_parent.items():
-        arr.sort(key=lambda a: a.code)
+    """`accounts` must already be ordered by `_sort_for_tree`."""
+    by_parent: dict[UUID | None, list[Account]] = {
+        parent_id: list(group) for parent_id, group in groupby(accounts, key=attrgetter("parent_id"))
+    }
+    label_fa_of = ACCOUNT_TYPE_FA.get
 
     def build(acc: Account) -> StatementAccountNode | None:
         acc_type = classify_account_code(acc.code)
-        children_nodes = [n for n in (build(ch) for ch in by_parent.get(acc.id, [])) if n is not None]
         own_total = int(totals.get(acc.id, 0))
         include_here = acc_type == section_type
+        # Rolled totals are sums of non-negative presentation values, so a zero
+        # total means an all-zero subtree: nothing under a foreign-type parent
+        # is worth a node.
+        if not include_here and own_total == 0:
+            return None
+        children_nodes = [n for n in (build(ch) for ch in by_parent.get(acc.id, [])) if n is not None]
         if not include_here and not children_nodes:
             return None
-        node = _node_from_account(acc, own_total, type_override=acc_type)
+        node = _node_from_account(acc, own_total, acc_type, label_fa_of(acc_type))
         node.children = children_nodes
         return node
 
@@ -237,7 +267,7 @@ def build_balance_sheet(
     currency: str | None = None,
 ) -> BalanceSheetResponse:
     period = default_period(None, to_date)
-    accounts = list_accounts(db)
+    accounts = _sort_for_tree(list_accounts(db))
     turnover = _build_balance_map(account_turnovers_upto(db, period.to_date, currency=currency))
 
     own_balances: dict[UUID, int] = {}
@@ -291,13 +321,14 @@ def build_income_statement(
     currency: str | None = None,
 ) -> IncomeStatementResponse:
     period = default_period(from_date, to_date)
-    accounts = list_accounts(db)
+    accounts = list_accounts_for_income(db)
     turnover = _build_balance_map(account_turnovers_between(db, period.from_date, period.to_date, currency=currency))
 
     revenues: list[StatementAccountNode] = []
     cogs: list[StatementAccountNode] = []
     operating_expenses: list[StatementAccountNode] = []
     other_expenses: list[StatementAccountNode] = []
+    label_fa_of = ACCOUNT_TYPE_FA.get
 
     for acc in accounts:
         tb = turnover.get(acc.id)
@@ -307,12 +338,12 @@ def build_income_statement(
         amount = max(0, balance_from_turnovers(acc_type, tb.debit, tb.credit))
         if amount == 0:
             continue
-        node = StatementAccountNode(
+        node = StatementAccountNode.model_construct(
             account_id=acc.id,
             account_code=acc.code,
             account_name=acc.name,
             account_type=acc_type,
-            label_fa=ACCOUNT_TYPE_FA.get(acc_type),
+            label_fa=label_fa_of(acc_type),
             balance=amount,
             debit_turnover=tb.debit,
             credit_turnover=tb.credit,
@@ -389,14 +420,19 @@ def build_income_statement(
     )
 
 
-def classify_cash_flow_activity(account_codes: list[str], account_types: list[str]) -> str:
+def classify_cash_flow_activity(account_codes: Sequence[str], account_types: Iterable[str]) -> str:
     """
     Unit-testable cash flow classifier.
     Returns: operating | investing | financing
+
+    `account_types` may be a lazy iterable: it is only consumed when the
+    code-prefix checks don't already decide the bucket.
     """
     if any(code.startswith("12") for code in account_codes):
         return "investing"
-    if any(code.startswith("31") for code in account_codes) or any(t in (EQUITY, LIABILITY) for t in account_types):
+    if any(code.startswith("31") for code in account_codes):
+        return "financing"
+    if any(t in (EQUITY, LIABILITY) for t in account_types):
         return "financing"
     return "operating"
 
@@ -423,7 +459,7 @@ def build_cash_flow_statement(
             continue
         counter = [ln for ln in txn.lines if not (ln.account.code or "").startswith("1110")]
         counter_codes = [ln.account.code for ln in counter]
-        counter_types = [classify_account_code(ln.account.code) for ln in counter]
+        counter_types = (classify_account_code(code) for code in counter_codes)
         bucket = classify_cash_flow_activity(counter_codes, counter_types)
         section_sums[bucket] += cash_delta
         label = txn.description or txn.reference or f"Transaction {txn.id}"
@@ -481,10 +517,28 @@ class FinancialStatementService:
         self.db = db
 
     def balance_sheet(self, to_date: date | None = None, comparative_to_date: date | None = None, currency: str | None = None) -> BalanceSheetResponse:
-        return build_balance_sheet(self.db, to_date=to_date, comparative_to_date=comparative_to_date, currency=currency)
+        to_date = default_period(None, to_date).to_date
+        return cached_statement(
+            self.db,
+            "balance_sheet",
+            (to_date, comparative_to_date, currency),
+            lambda: build_balance_sheet(self.db, to_date=to_date, comparative_to_date=comparative_to_date, currency=currency),
+        )
 
     def income_statement(self, from_date: date | None = None, to_date: date | None = None, currency: str | None = None) -> IncomeStatementResponse:
-        return build_income_statement(self.db, from_date=from_date, to_date=to_date, currency=currency)
+        period = default_period(from_date, to_date)
+        return cached_statement(
+            self.db,
+            "income_statement",
+            (period.from_date, period.to_date, currency),
+            lambda: build_income_statement(self.db, from_date=period.from_date, to_date=period.to_date, currency=currency),
+        )
 
     def cash_flow_statement(self, from_date: date | None = None, to_date: date | None = None, currency: str | None = None) -> CashFlowResponse:
-        return build_cash_flow_statement(self.db, from_date=from_date, to_date=to_date, currency=currency)
+        period = default_period(from_date, to_date)
+        return cached_statement(
+            self.db,
+            "cash_flow",
+            (period.from_date, period.to_date, currency),
+            lambda: build_cash_flow_statement(self.db, from_date=period.from_date, to_date=period.to_date, currency=currency),
+        )
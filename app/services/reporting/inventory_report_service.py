@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-from collections import defaultdict
+from collections.abc import Iterable
 from dataclasses import dataclass
 from datetime import date
 from uuid import UUID
 
+import numpy as np
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
 
@@ -21,13 +22,14 @@ from app.schemas.manager_report import (
 )
 from app.services.reporting.common import default_period
 from app.services.reporting.repository import (
+    inventory_items_by_id,
     inventory_movements_for_balance,
     list_inventory_items,
     paged_inventory_movements,
 )
 
 
-@dataclass
+@dataclass(slots=True)
 class ItemAccumulator:
     qty_in: float = 0.0
     qty_out: float = 0.0
@@ -70,6 +72,147 @@ def apply_inventory_movement(acc: ItemAccumulator, movement_type: str, quantity:
     return acc
 
 
+def _replay_movements(
+    accs: list[ItemAccumulator],
+    item_idx: list[int],
+    types: list[str],
+    qtys: list[float],
+    costs: list[int],
+    rows: Iterable[int],
+) -> None:
+    for r in rows:
+        apply_inventory_movement(accs[item_idx[r]], types[r], qtys[r], costs[r])
+
+
+def _fill_accumulators(accs, items, qty_in, qty_out, on_hand, inventory_value, cogs) -> None:
+    for i in items:
+        acc = accs[i]
+        acc.qty_in = float(qty_in[i])
+        acc.qty_out = float(qty_out[i])
+        acc.on_hand = float(on_hand[i])
+        acc.inventory_value = int(inventory_value[i])
+        acc.cogs = int(cogs[i])
+
+
+_MOVEMENT_IN, _MOVEMENT_OUT, _MOVEMENT_ADJUSTMENT = 0, 1, 2
+_MOVEMENT_CODES = {
+    InventoryMovementType.IN.value: _MOVEMENT_IN,
+    InventoryMovementType.OUT.value: _MOVEMENT_OUT,
+    InventoryMovementType.ADJUSTMENT.value: _MOVEMENT_ADJUSTMENT,
+}
+
+
+def _replay_kernel(idx, typ, qty, cost, n_items):
+    """
+    Array form of `apply_inventory_movement` over every row, in order.
+    Compiled with Numba when it is installed.
+    """
+    qty_in = np.zeros(n_items)
+    qty_out = np.zeros(n_items)
+    on_hand = np.zeros(n_items)
+    value = np.zeros(n_items, dtype=np.int64)
+    cogs = np.zeros(n_items, dtype=np.int64)
+    for r in range(idx.shape[0]):
+        q = qty[r]
+        if q <= 0:
+            continue
+        i = idx[r]
+        c = cost[r]
+        if typ[r] == _MOVEMENT_OUT:
+            qty_out[i] += q
+            if c > 0:
+                use_cost = c
+            elif on_hand[i] > 0:
+                use_cost = np.int64(np.rint(value[i] / on_hand[i]))
+            else:
+                use_cost = np.int64(0)
+            cogs_value = np.int64(np.rint(q * use_cost))
+            cogs[i] += cogs_value
+            on_hand[i] = max(0.0, on_hand[i] - q)
+            value[i] = max(np.int64(0), value[i] - cogs_value)
+        else:
+            qty_in[i] += q
+            on_hand[i] += q
+            value[i] += np.int64(np.rint(q * c))
+    return qty_in, qty_out, on_hand, value, cogs
+
+
+try:
+    from numba import njit
+except ImportError:  # optional accelerator; the NumPy path is exact without it
+    _replay_kernel_jit = None
+else:
+    _replay_kernel_jit = njit(cache=True)(_replay_kernel)
+
+
+def accumulate_movements(
+    item_idx: list[int],
+    types: list[str],
+    qtys: list[float],
+    costs: list[int],
+    n_items: int,
+) -> list[ItemAccumulator]:
+    """
+    Fold date-ordered movements into one accumulator per dense item index.
+
+    Equivalent to calling `apply_inventory_movement` row by row. With Numba
+    installed the whole history runs through the compiled kernel. Otherwise
+    items whose history is a plain running sum — every OUT carries its own
+    cost and neither on-hand nor value ever clamps at zero — are reduced with
+    NumPy group sums, and the rest are replayed through the scalar calculator.
+    """
+    accs = [ItemAccumulator() for _ in range(n_items)]
+    if not item_idx:
+        return accs
+
+    idx = np.asarray(item_idx, dtype=np.intp)
+    qty = np.asarray(qtys, dtype=np.float64)
+    cost = np.asarray(costs, dtype=np.int64)
+    if _replay_kernel_jit is not None:
+        typ = np.fromiter((_MOVEMENT_CODES[t] for t in types), dtype=np.int8, count=len(types))
+        _fill_accumulators(accs, range(n_items), *_replay_kernel_jit(idx, typ, qty, cost, n_items))
+        return accs
+
+    live = qty > 0
+    is_out = live & (np.asarray(types) == InventoryMovementType.OUT.value)
+    is_in = live & ~is_out
+    value = np.rint(qty * cost).astype(np.int64)
+    signed_qty = np.where(is_in, qty, np.where(is_out, -qty, 0.0))
+    signed_value = np.where(is_in, value, np.where(is_out, -value, 0))
+
+    # Running on-hand / value per item, to find items that would clamp.
+    order = np.argsort(idx, kind="stable")
+    sorted_idx = idx[order]
+    boundary = np.r_[True, sorted_idx[1:] != sorted_idx[:-1]]
+    starts = np.flatnonzero(boundary)
+    group = np.cumsum(boundary) - 1
+    run_qty = np.cumsum(signed_qty[order])
+    run_qty -= (run_qty - signed_qty[order])[starts][group]
+    run_value = np.cumsum(signed_value[order])
+    run_value -= (run_value - signed_value[order])[starts][group]
+    # Integral quantities sum exactly in float64; otherwise leave a margin so
+    # borderline sell-outs take the exact sequential path.
+    qty_slack = 0.0 if np.all(qty == np.floor(qty)) else 1e-9 * float(np.abs(qty).sum())
+
+    sequential = np.zeros(n_items, dtype=bool)
+    sequential[sorted_idx[starts]] = (np.minimum.reduceat(run_qty, starts) < qty_slack) | (
+        np.minimum.reduceat(run_value, starts) < 0
+    )
+    sequential[idx[is_out & (cost <= 0)]] = True
+
+    qty_in = np.bincount(idx, weights=np.where(is_in, qty, 0.0), minlength=n_items)
+    qty_out = np.bincount(idx, weights=np.where(is_out, qty, 0.0), minlength=n_items)
+    on_hand = np.bincount(idx, weights=signed_qty, minlength=n_items)
+    inventory_value = np.zeros(n_items, dtype=np.int64)
+    np.add.at(inventory_value, idx, signed_value)
+    cogs = np.zeros(n_items, dtype=np.int64)
+    np.add.at(cogs, idx, np.where(is_out, value, 0))
+
+    _fill_accumulators(accs, np.flatnonzero(~sequential).tolist(), qty_in, qty_out, on_hand, inventory_value, cogs)
+    _replay_movements(accs, item_idx, types, qtys, costs, np.flatnonzero(sequential[idx]).tolist())
+    return accs
+
+
 class InventoryReportService:
     def __init__(self, db: Session):
         self.db = db
@@ -129,7 +272,7 @@ class InventoryReportService:
         period = default_period(from_date, to_date)
         total, rows = paged_inventory_movements(self.db, period.from_date, period.to_date, page, page_size, item_id=item_id)
         mapped = [
-            InventoryMovementRead(
+            InventoryMovementRead.model_construct(
                 id=mv.id,
                 item_id=item.id,
                 item_name=item.name,
@@ -153,25 +296,38 @@ class InventoryReportService:
 
     def balance_report(self, to_date: date | None = None) -> InventoryBalanceResponse:
         period = default_period(None, to_date)
-        rows = inventory_movements_for_balance(self.db, period.to_date)
-        item_map: dict[UUID, dict] = {}
-        stats: dict[UUID, ItemAccumulator] = defaultdict(ItemAccumulator)
-        for mv, item in rows:
-            item_map[item.id] = {"name": item.name, "sku": item.sku, "unit": item.unit}
-            acc = stats[item.id]
-            apply_inventory_movement(acc, mv.movement_type.value, float(mv.quantity), int(mv.unit_cost or 0))
+        movements = inventory_movements_for_balance(self.db, period.to_date)
+        index: dict[UUID, int] = {}
+        item_idx: list[int] = []
+        types: list[str] = []
+        qtys: list[float] = []
+        costs: list[int] = []
+        for item_id, movement_type, quantity, unit_cost in movements:
+            i = index.get(item_id)
+            if i is None:
+                i = index[item_id] = len(index)
+            item_idx.append(i)
+            types.append(movement_type.value)
+            qtys.append(float(quantity or 0))
+            costs.append(int(unit_cost or 0))
+        # Read after the stream, so every item it saw has been committed; one
+        # deleted since then simply drops out of the report.
+        items_by_id = inventory_items_by_id(self.db, index)
+        items = [items_by_id.get(item_id) for item_id in index]
+        stats = accumulate_movements(item_idx, types, qtys, costs, len(index))
 
         out: list[InventoryBalanceRow] = []
         total_value = 0
         total_cogs = 0
         total_qty = 0.0
-        for item_id, acc in stats.items():
-            meta = item_map[item_id]
-            row = InventoryBalanceRow(
-                item_id=item_id,
-                sku=meta["sku"],
-                item_name=meta["name"],
-                unit=meta["unit"] or "unit",
+        for item, acc in zip(items, stats, strict=True):
+            if item is None:
+                continue
+            row = InventoryBalanceRow.model_construct(
+                item_id=item.id,
+                sku=item.sku,
+                item_name=item.name,
+                unit=item.unit or "unit",
                 qty_in=round(acc.qty_in, 4),
                 qty_out=round(acc.qty_out, 4),
                 on_hand_qty=round(acc.on_hand, 4),
@@ -34,6 +34,7 @@ Codes that don't exist in the chart simply contribute 0 to their row.
 from __future__ import annotations
 
 from datetime import date, timedelta
+from uuid import UUID
 
 from sqlalchemy.orm import Session
 
@@ -517,18 +518,13 @@ def _bs_bucket_for_code(code: str) -> tuple[str, str] | None:
     return None
 
 
-def _ir_pl_to_date(
-    db: Session, accounts: list[Account], as_of: date, currency: str | None,
-) -> int:
+def _ir_pl_to_date(accounts: list[Account], turnovers: dict[UUID, tuple[int, int]]) -> int:
     """Net profit/(loss) since inception, computed from the P&L accounts.
     Folded into retained earnings on the BS so the statement balances even
-    when closing entries haven't been posted."""
+    when closing entries haven't been posted. Reads the balance sheet's own
+    as-of ``turnovers`` rather than querying them again."""
     from app.services.reporting.common import REVENUE, EXPENSE
 
-    turnovers = {
-        account_id: (debit, credit)
-        for account_id, debit, credit in account_turnovers_upto(db, as_of, currency=currency)
-    }
     total = 0
     for acc in accounts:
         acc_type = classify_account_code(acc.code)
@@ -576,7 +572,7 @@ def _balance_sheet_buckets(
             # Other buckets render as positive magnitude — section context
             # determines interpretation (asset vs liability vs equity).
             buckets[key] = buckets.get(key, 0) + max(0, balance)
-    pl_to_date = _ir_pl_to_date(db, accounts, as_of, currency)
+    pl_to_date = _ir_pl_to_date(accounts, turnovers)
     if pl_to_date:
         buckets[("equity", "eq_retained_earnings")] = (
             buckets.get(("equity", "eq_retained_earnings"), 0) + pl_to_date
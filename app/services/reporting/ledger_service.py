@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from collections.abc import Iterable
 from datetime import date
 from uuid import UUID
 
@@ -24,27 +25,32 @@ from app.schemas.manager_report import (
 )
 from app.services.reporting.common import ASSET, EXPENSE, OTHER, balance_from_turnovers, classify_account_code, default_period
 from app.services.reporting.repository import (
-    opening_balance_before,
     paged_account_lines,
     paged_journal_entries,
-    trial_balance_rows,
+    paged_trial_balance_rows,
 )
 
 
-def _to_journal_item(txn: Transaction) -> JournalEntryRead:
-    lines = [
-        JournalLineRead(
-            account_code=ln.account.code,
-            account_name=ln.account.name,
-            debit=int(ln.debit or 0),
-            credit=int(ln.credit or 0),
-            line_description=ln.line_description,
+def _to_journal_item(txn, lines_in: Iterable[tuple[str, str, int, int, str | None]]) -> JournalEntryRead:
+    """``txn`` needs ``id, date, reference, description``; lines are
+    ``(account_code, account_name, debit, credit, line_description)``."""
+    lines: list[JournalLineRead] = []
+    total_debit = total_credit = 0
+    for account_code, account_name, debit, credit, line_description in lines_in:
+        debit = int(debit or 0)
+        credit = int(credit or 0)
+        total_debit += debit
+        total_credit += credit
+        lines.append(
+            JournalLineRead.model_construct(
+                account_code=account_code,
+                account_name=account_name,
+                debit=debit,
+                credit=credit,
+                line_description=line_description,
+            )
         )
-        for ln in txn.lines
-    ]
-    total_debit = int(sum(ln.debit for ln in lines))
-    total_credit = int(sum(ln.credit for ln in lines))
-    return JournalEntryRead(
+    return JournalEntryRead.model_construct(
         transaction_id=txn.id,
         date=txn.date,
         reference=txn.reference,
@@ -67,40 +73,40 @@ class LedgerService:
             page=page,
             page_size=page_size,
             total=total,
-            items=[_to_journal_item(t) for t in items],
+            items=[_to_journal_item(header, lines) for header, lines in items],
         )
 
     def account_ledger(self, account_code: str, from_date: date | None, to_date: date | None, page: int = 1, page_size: int = 100, currency: str | None = None) -> AccountLedgerResponse:
         period = default_period(from_date, to_date)
-        acc, total, rows = paged_account_lines(self.db, account_code, period.from_date, period.to_date, page, page_size, currency=currency)
+        acc, total, (opening_debit, opening_credit), rows = paged_account_lines(
+            self.db, account_code, period.from_date, period.to_date, page, page_size, currency=currency
+        )
         if not acc:
             raise HTTPException(status_code=404, detail=f"Account not found: {account_code}")
 
-        opening_debit, opening_credit = opening_balance_before(self.db, acc.id, period.from_date, currency=currency)
         acc_type = classify_account_code(acc.code)
-        running = balance_from_turnovers(acc_type, opening_debit, opening_credit)
+        opening = balance_from_turnovers(acc_type, opening_debit, opening_credit)
+        sign = 1 if acc_type in (ASSET, EXPENSE, OTHER) else -1
+        running = opening
         out_rows: list[LedgerDetailRow] = []
         debit_turnover = 0
         credit_turnover = 0
-        for line, txn in rows:
-            debit = int(line.debit or 0)
-            credit = int(line.credit or 0)
+        for row in rows:
+            debit = int(row.debit or 0)
+            credit = int(row.credit or 0)
             debit_turnover += debit
             credit_turnover += credit
-            if acc_type in (ASSET, EXPENSE, OTHER):
-                running += debit - credit
-            else:
-                running += credit - debit
+            running = opening + sign * int(row.cumulative_net or 0)
             out_rows.append(
-                LedgerDetailRow(
-                    date=txn.date,
-                    transaction_id=txn.id,
-                    reference=txn.reference,
-                    description=txn.description,
+                LedgerDetailRow.model_construct(
+                    date=row.date,
+                    transaction_id=row.id,
+                    reference=row.reference,
+                    description=row.description,
                     debit=debit,
                     credit=credit,
                     running_balance=running,
-                    line_description=line.line_description,
+                    line_description=row.line_description,
                 )
             )
 
@@ -133,28 +139,20 @@ class LedgerService:
         currency: str | None = None,
     ) -> TrialBalanceResponse:
         period = default_period(from_date, to_date)
-        rows = trial_balance_rows(self.db, period.from_date, period.to_date, currency=currency)
-        total = len(rows)
-        offset = max(0, (page - 1) * page_size)
-        window = rows[offset : offset + page_size]
+        total, window, (td_turn, tc_turn, td_bal, tc_bal) = paged_trial_balance_rows(
+            self.db, period.from_date, period.to_date, page, page_size, currency=currency
+        )
         out_rows: list[TrialBalanceRow] = []
-        td_turn = tc_turn = td_bal = tc_bal = 0
         for code, name, d_turn, c_turn in window:
             net = d_turn - c_turn
-            dbal = net if net > 0 else 0
-            cbal = -net if net < 0 else 0
-            td_turn += d_turn
-            tc_turn += c_turn
-            td_bal += dbal
-            tc_bal += cbal
             out_rows.append(
-                TrialBalanceRow(
+                TrialBalanceRow.model_construct(
                     account_code=code,
                     account_name=name,
                     debit_turnover=d_turn,
                     credit_turnover=c_turn,
-                    debit_balance=dbal,
-                    credit_balance=cbal,
+                    debit_balance=net if net > 0 else 0,
+                    credit_balance=-net if net < 0 else 0,
                 )
             )
         return TrialBalanceResponse(
@@ -183,7 +181,7 @@ class LedgerService:
     ) -> CashBankStatementResponse:
         report = self.account_ledger(account_code=account_code, from_date=from_date, to_date=to_date, page=page, page_size=page_size, currency=currency)
         rows = [
-            CashBankStatementRow(
+            CashBankStatementRow.model_construct(
                 date=r.date,
                 transaction_id=r.transaction_id,
                 reference=r.reference,
@@ -223,22 +221,23 @@ class LedgerService:
             reference=(reference or (f"REV-{src.reference}" if src.reference else f"REV-{src.id.hex[:8]}"))[:128],
             description=(description or f"Reversal of {src.id}"),
             currency=src.currency,
-        )
-        self.db.add(rev)
-        self.db.flush()
-        for line in src.lines:
-            self.db.add(
+            lines=[
                 TransactionLine(
-                    transaction_id=rev.id,
-                    account_id=line.account_id,
+                    account=line.account,
                     debit=int(line.credit or 0),
                     credit=int(line.debit or 0),
                     line_description=(line.line_description or "Reversal"),
                 )
-            )
+                for line in src.lines
+            ],
+        )
+        self.db.add(rev)
+        self.db.flush()
+        # The reversal and its accounts are all in memory: build the response
+        # now instead of re-selecting it after commit expires them.
+        item = _to_journal_item(
+            rev,
+            ((ln.account.code, ln.account.name, ln.debit, ln.credit, ln.line_description) for ln in rev.lines),
+        )
         self.db.commit()
-        self.db.refresh(rev)
-        loaded = self.db.execute(
-            select(Transaction).where(Transaction.id == rev.id).options(selectinload(Transaction.lines).selectinload(TransactionLine.account))
-        ).scalars().one()
-        return _to_journal_item(loaded)
+        return item
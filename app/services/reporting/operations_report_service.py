@@ -1,13 +1,13 @@
 from __future__ import annotations
 
-from collections import defaultdict
 from datetime import date
 from uuid import UUID
 
 from fastapi import HTTPException
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
+from app.models.account import Account
 from app.models.entity import Entity, TransactionEntity
 from app.models.transaction import Transaction, TransactionLine
 from app.schemas.manager_report import (
@@ -18,17 +18,7 @@ from app.schemas.manager_report import (
     ReportPeriod,
 )
 from app.services.reporting.common import default_period
-from app.services.reporting.repository import debtor_creditor_movements
-
-
-def _aging_bucket(days_old: int) -> str:
-    if days_old <= 30:
-        return "current"
-    if days_old <= 60:
-        return "days_31_60"
-    if days_old <= 90:
-        return "days_61_90"
-    return "days_90_plus"
+from app.services.reporting.repository import debtor_creditor_aging
 
 
 class OperationsReportService:
@@ -37,67 +27,27 @@ class OperationsReportService:
 
     def debtor_creditor(self, from_date: date | None, to_date: date | None, currency: str | None = None) -> DebtorCreditorResponse:
         period = default_period(from_date, to_date)
-        rows = debtor_creditor_movements(self.db, period.from_date, period.to_date, currency=currency)
-        today = period.to_date
-
-        deb: dict[UUID | None, dict] = defaultdict(
-            lambda: {"name": "Unassigned", "type": "client", "current": 0, "days_31_60": 0, "days_61_90": 0, "days_90_plus": 0}
-        )
-        cred: dict[UUID | None, dict] = defaultdict(
-            lambda: {"name": "Unassigned", "type": "supplier", "current": 0, "days_31_60": 0, "days_61_90": 0, "days_90_plus": 0}
-        )
-
-        for tx_date, role, entity_id, name, delta in rows:
-            days_old = max(0, (today - tx_date).days)
-            bucket = _aging_bucket(days_old)
-            target = deb if role == "debtor" else cred
-            target[entity_id]["name"] = name or "Unassigned"
-            target[entity_id][bucket] += int(delta or 0)
+        rows = debtor_creditor_aging(self.db, period.from_date, period.to_date, currency=currency)
 
         debtors: list[DebtorCreditorRow] = []
         creditors: list[DebtorCreditorRow] = []
-        total_deb = total_cred = 0
-        for entity_id, d in deb.items():
-            total = int(d["current"] + d["days_31_60"] + d["days_61_90"] + d["days_90_plus"])
-            if total <= 0:
-                continue
-            total_deb += total
-            debtors.append(
-                DebtorCreditorRow(
-                    entity_id=entity_id,
-                    entity_name=d["name"],
-                    entity_type=d["type"],
-                    current=int(d["current"]),
-                    days_31_60=int(d["days_31_60"]),
-                    days_61_90=int(d["days_61_90"]),
-                    days_90_plus=int(d["days_90_plus"]),
-                    total=total,
-                )
-            )
-        for entity_id, d in cred.items():
-            total = int(d["current"] + d["days_31_60"] + d["days_61_90"] + d["days_90_plus"])
-            if total <= 0:
-                continue
-            total_cred += total
-            creditors.append(
-                DebtorCreditorRow(
-                    entity_id=entity_id,
-                    entity_name=d["name"],
-                    entity_type=d["type"],
-                    current=int(d["current"]),
-                    days_31_60=int(d["days_31_60"]),
-                    days_61_90=int(d["days_61_90"]),
-                    days_90_plus=int(d["days_90_plus"]),
-                    total=total,
-                )
+        for role, entity_id, name, current, days_31_60, days_61_90, days_90_plus, total in rows:
+            row = DebtorCreditorRow(
+                entity_id=entity_id,
+                entity_name=name,
+                entity_type="client" if role == "debtor" else "supplier",
+                current=current,
+                days_31_60=days_31_60,
+                days_61_90=days_61_90,
+                days_90_plus=days_90_plus,
+                total=total,
             )
-        debtors.sort(key=lambda x: x.total, reverse=True)
-        creditors.sort(key=lambda x: x.total, reverse=True)
+            (debtors if role == "debtor" else creditors).append(row)
         return DebtorCreditorResponse(
             period=ReportPeriod(from_date=period.from_date, to_date=period.to_date),
             debtors=debtors,
             creditors=creditors,
-            totals={"debtors": total_deb, "creditors": total_cred},
+            totals={"debtors": sum(r.total for r in debtors), "creditors": sum(r.total for r in creditors)},
         )
 
     def person_running_balance(
@@ -118,110 +68,82 @@ class OperationsReportService:
                 detail="role must be client, supplier, payee, bank, or shareholder",
             )
 
+        # تفضیلی (per-person sub-ledger) — resolve the AR / AP / bank accounts
+        # for the ACTIVE locale instead of the previous hardcoded Iranian codes
+        # (1112 / 21xx / 1110), so the person ledger works on every chart.
+        from app.services.account_resolver import resolve_account_code
+        if role_key == "client":
+            account_filter = Account.code == resolve_account_code(self.db, "ar")
+            sign = 1
+        elif role_key in ("supplier", "payee"):
+            account_filter = Account.code.like(f"{resolve_account_code(self.db, 'ap')[:2]}%")
+            sign = -1
+        elif role_key == "shareholder":
+            # Shareholder (تفضیلی) ledger follows their equity/claim accounts:
+            # share capital (contributions), dividends payable, and current
+            # account. Credit-normal claim: their stake rises when credited
+            # (contribution, dividend declared, loan in) and falls when debited
+            # (dividend paid, withdrawal).
+            equity_codes: set[str] = set()
+            for cat in ("share_capital", "dividends_payable", "shareholder_current"):
+                try:
+                    equity_codes.add(resolve_account_code(self.db, cat))
+                except Exception:
+                    pass
+            account_filter = Account.code.in_(equity_codes)
+            sign = -1
+        else:
+            # A bank entity's own linked GL account (Entity.code) wins over the
+            # generic bank account — each bank has its own سرفصل.
+            own_bank_code = (entity.code or "").strip() or None
+            account_filter = Account.code == (own_bank_code or resolve_account_code(self.db, "bank"))
+            sign = 1
+
+        # Lines are filtered to the role's accounts in SQL, and the running
+        # balance is a window sum over exactly those lines.
+        delta = sign * (TransactionLine.debit - TransactionLine.credit)
+        order = (Transaction.date, Transaction.created_at, Transaction.id, TransactionLine.id)
         q = (
-            select(Transaction, TransactionLine)
+            select(
+                Transaction.date,
+                Transaction.id,
+                Transaction.reference,
+                Transaction.description,
+                delta,
+                func.sum(delta).over(order_by=order),
+            )
             .join(TransactionEntity, TransactionEntity.transaction_id == Transaction.id)
             .join(TransactionLine, TransactionLine.transaction_id == Transaction.id)
-            .join(TransactionLine.account)
+            .join(Account, Account.id == TransactionLine.account_id)
             .where(
                 TransactionEntity.entity_id == entity_id,
                 TransactionEntity.role == role_key,
                 Transaction.date >= period.from_date,
                 Transaction.date <= period.to_date,
+                account_filter,
             )
-            .order_by(Transaction.date, Transaction.created_at, Transaction.id)
+            .order_by(*order)
         )
-        rows = self.db.execute(q).all()
-        # تفضیلی (per-person sub-ledger) — resolve the AR / AP / bank accounts
-        # for the ACTIVE locale instead of the previous hardcoded Iranian codes
-        # (1112 / 21xx / 1110), so the person ledger works on every chart.
-        from app.services.account_resolver import resolve_account_code
-        ar_code = resolve_account_code(self.db, "ar")
-        ap_prefix = resolve_account_code(self.db, "ap")[:2]
-        bank_code = resolve_account_code(self.db, "bank")
-        # A bank entity's own linked GL account (Entity.code) wins over the
-        # generic bank account — each bank has its own سرفصل.
-        own_bank_code = (entity.code or "").strip() or None
-        # Shareholder (تفضیلی) ledger follows their equity/claim accounts: share
-        # capital (contributions), dividends payable, and current account.
-        equity_codes: set[str] = set()
-        if role_key == "shareholder":
-            for cat in ("share_capital", "dividends_payable", "shareholder_current"):
-                try:
-                    equity_codes.add(resolve_account_code(self.db, cat))
-                except Exception:
-                    pass
+        # Debit-normal roles (client, bank) show an increase as a debit effect;
+        # credit-normal ones (supplier, payee, shareholder) as a credit effect.
+        debit_normal = sign > 0
         running = 0
         out: list[PersonRunningBalanceRow] = []
-        for txn, line in rows:
-            code = line.account.code
-            if role_key == "client":
-                if code != ar_code:
-                    continue
-                delta = int(line.debit or 0) - int(line.credit or 0)
-                running += delta
-                out.append(
-                    PersonRunningBalanceRow(
-                        date=txn.date,
-                        transaction_id=txn.id,
-                        reference=txn.reference,
-                        description=txn.description,
-                        debit_effect=max(0, delta),
-                        credit_effect=max(0, -delta),
-                        running_balance=running,
-                    )
-                )
-            elif role_key in ("supplier", "payee"):
-                if not code.startswith(ap_prefix):
-                    continue
-                delta = int(line.credit or 0) - int(line.debit or 0)
-                running += delta
-                out.append(
-                    PersonRunningBalanceRow(
-                        date=txn.date,
-                        transaction_id=txn.id,
-                        reference=txn.reference,
-                        description=txn.description,
-                        debit_effect=max(0, -delta),
-                        credit_effect=max(0, delta),
-                        running_balance=running,
-                    )
-                )
-            elif role_key == "shareholder":
-                # Credit-normal claim: their stake/what the company owes them
-                # rises when credited (contribution, dividend declared, loan in)
-                # and falls when debited (dividend paid, withdrawal).
-                if code not in equity_codes:
-                    continue
-                delta = int(line.credit or 0) - int(line.debit or 0)
-                running += delta
-                out.append(
-                    PersonRunningBalanceRow(
-                        date=txn.date,
-                        transaction_id=txn.id,
-                        reference=txn.reference,
-                        description=txn.description,
-                        debit_effect=max(0, -delta),
-                        credit_effect=max(0, delta),
-                        running_balance=running,
-                    )
-                )
-            else:
-                if code != (own_bank_code or bank_code):
-                    continue
-                delta = int(line.debit or 0) - int(line.credit or 0)
-                running += delta
-                out.append(
-                    PersonRunningBalanceRow(
-                        date=txn.date,
-                        transaction_id=txn.id,
-                        reference=txn.reference,
-                        description=txn.description,
-                        debit_effect=max(0, delta),
-                        credit_effect=max(0, -delta),
-                        running_balance=running,
-                    )
+        for tx_date, tx_id, reference, description, line_delta, running in self.db.execute(q).all():
+            line_delta = int(line_delta or 0)
+            running = int(running or 0)
+            increase, decrease = max(0, line_delta), max(0, -line_delta)
+            out.append(
+                PersonRunningBalanceRow(
+                    date=tx_date,
+                    transaction_id=tx_id,
+                    reference=reference,
+                    description=description,
+                    debit_effect=increase if debit_normal else decrease,
+                    credit_effect=decrease if debit_normal else increase,
+                    running_balance=running,
                 )
+            )
         return PersonRunningBalanceResponse(
             period=ReportPeriod(from_date=period.from_date, to_date=period.to_date),
             entity_id=entity.id,
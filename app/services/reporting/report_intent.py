@@ -3,12 +3,13 @@ from __future__ import annotations
 import re
 from dataclasses import dataclass
 from datetime import date, timedelta
+from functools import cache, lru_cache, partial
 
 from app.services.reporting.common import ParsedRange, period_for_keyword
-from app.utils.jalali import try_parse_jalali
+from app.utils.jalali import _JALALI_DMY, _JALALI_YMD, jalali_to_gregorian, try_parse_jalali_month_name
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ReportIntent:
     key: str
     from_date: date | None = None
@@ -18,74 +19,125 @@ class ReportIntent:
     limit: int | None = None
 
 
+_WS = re.compile(r"\s+")
+_BANK_NAME_JUNK = re.compile(r"[^\w\u0600-\u06FF\s\-]")
+_ISO_DATE = re.compile(r"\b(\d{4}-\d{2}-\d{2})\b")
+_LAST_N_DAYS = re.compile(r"\blast\s+(\d{1,3})\s+days?\b")
+_LAST_N_MONTHS = re.compile(r"\blast\s+(\d{1,2})\s+months?\b")
+_ACCOUNT_CODE = re.compile(r"\b([1-9][0-9]{3})\b")
+_BANK_NAME_BEFORE = re.compile(r"\b([A-Za-z][A-Za-z0-9]{1,30})\s+bank\b", re.IGNORECASE)
+_BANK_NAME_AFTER = re.compile(r"\b(?:bank)\s+([A-Za-z][A-Za-z0-9\s]{1,30})", re.IGNORECASE)
+_BANK_NAME_FA = re.compile(r"بانک\s+([آ-یA-Za-z0-9\s]{1,30})")
+_LIMIT_AFTER = re.compile(r"\b(?:last|latest)\s+(\d{1,3})\b", re.IGNORECASE)
+_LIMIT_BEFORE = re.compile(r"\b(\d{1,3})\s+(?:latest|last)\b", re.IGNORECASE)
+_BALANCE = re.compile(r"\b(?:current\s+)?balance\b")
+_HOW_MUCH_MONEY = re.compile(r"\bhow much\b.*\b(?:money|have|bank|cash|in the bank)\b")
+_WHATS_MY_MONEY = re.compile(r"\b(?:whats?|what'?s)\s+my\s+(?:cash|money|balance)\b")
+_TOTAL_MONEY = re.compile(r"\btotal\s+(?:money|cash|balance)\b")
+_WHO_OWES = re.compile(r"\b(?:who\s+owes?|owes?\s+me|owe\s+to|how much\s+(?:do\s+)?i\s+owe)\b")
+_EXPENSE_WORDS = re.compile(r"\b(?:expenses?|spending|spent|spend)\b")
+_EXPENSE_CONTEXT = re.compile(r"\b(?:this|last|show|what|how much|my)\b")
+_REVENUE_WORDS = re.compile(r"\b(?:revenue|income|earn(?:ed|ings?)?|mak(?:e|ing)|sold)\b")
+_REVENUE_CONTEXT = re.compile(r"\b(?:this|last|show|what|how much|my|total)\b")
+
+
+# Relative-period keywords, in priority order: the first one present wins.
+_PERIOD_KEYWORDS = (
+    "today",
+    "امروز",
+    "yesterday",
+    "دیروز",
+    "this month",
+    "این ماه",
+    "last month",
+    "ماه قبل",
+    "ماه گذشته",
+    "this year",
+    "امسال",
+    "از اول سال",
+    "last week",
+    "هفته قبل",
+    "هفته گذشته",
+    "three months",
+    "last 3 months",
+    "سه ماه اخیر",
+)
+
+
+# Arabic yeh/kaf to Persian, ZWNJ to a space, Persian digits to ASCII — one
+# str.translate pass instead of a chain of replace() calls.
+_NORMALIZE_TABLE = str.maketrans("يك\u200c۰۱۲۳۴۵۶۷۸۹", "یک 0123456789")
+
+
+@lru_cache(maxsize=256)
 def _normalize_text(text: str) -> str:
-    t = (text or "").strip().lower()
-    t = t.replace("ي", "ی").replace("ك", "ک")
-    t = t.replace("\u200c", " ").replace("‌", " ")
-    t = re.sub(r"\s+", " ", t)
-    return t
-
-
+    t = (text or "").strip().lower().translate(_NORMALIZE_TABLE)
+    return _WS.sub(" ", t)
+
+
+# Words that frame a bank name in chat ("گردش حساب بانک ملت", "the balance of
+# Mellat bank for this month") rather than belong to it.
+_BANK_STOP_WORDS = (
+    "هم",
+    "میخوام",
+    "میخواهم",
+    "مخوام",
+    "رو",
+    "را",
+    "از",
+    "برای",
+    "در",
+    "این",
+    "ماه",
+    "سال",
+    "حساب",
+    "گردش",
+    "statement",
+    "report",
+    "for",
+    "bank",
+    "account",
+    "ledger",
+    "balance",
+    "current",
+    "show",
+    "the",
+    "of",
+)
+_STOP_WORD = "(?:" + "|".join(map(re.escape, _BANK_STOP_WORDS)) + ")"
+# Cleaned names are single-space separated, so a stop word is a whole token
+# when bounded by a space or the string edge.
+_LEADING_STOP_WORDS = re.compile(rf"^(?:{_STOP_WORD}(?: |$))+")
+_NEXT_STOP_WORD = re.compile(rf" {_STOP_WORD}(?= |$)")
+
+
+@lru_cache(maxsize=256)
 def _cleanup_bank_name(name: str) -> str:
     raw = _normalize_text(name)
-    raw = re.sub(r"[^\w\u0600-\u06FF\s\-]", " ", raw)
-    raw = re.sub(r"\s+", " ", raw).strip()
-    stop_words = {
-        "هم",
-        "میخوام",
-        "می خواهم",
-        "میخواهم",
-        "می‌خوام",
-        "مخوام",
-        "رو",
-        "را",
-        "از",
-        "برای",
-        "در",
-        "این",
-        "ماه",
-        "سال",
-        "حساب",
-        "گردش",
-        "statement",
-        "report",
-        "for",
-        "bank",
-        "account",
-        "ledger",
-        "balance",
-        "current",
-        "show",
-        "the",
-        "of",
-    }
-    parts = [p for p in raw.split(" ") if p]
-    while parts and parts[0] in stop_words:
-        parts.pop(0)
-    cleaned: list[str] = []
-    for p in parts:
-        if p in stop_words:
-            break
-        cleaned.append(p)
-    out = " ".join(cleaned).strip()
-    return out or (" ".join(parts).strip() if parts else raw)
+    raw = _BANK_NAME_JUNK.sub(" ", raw)
+    raw = _WS.sub(" ", raw).strip()
+    # Drop leading stop words, then cut at the first one after the name.
+    name_onward = _LEADING_STOP_WORDS.sub("", raw, count=1)
+    if not name_onward:
+        return raw
+    m = _NEXT_STOP_WORD.search(name_onward)
+    return name_onward[: m.start()] if m else name_onward
 
 
 def _extract_dates(text: str, today: date | None = None) -> tuple[date | None, date | None]:
+    """``text`` must already be ``_normalize_text`` output (lowercased, ASCII digits)."""
     now = today or date.today()
-    t = (text or "").strip().lower()
+    t = text or ""
 
     # --- Jalali numeric dates: 1404/11/27 or ۱۴۰۴/۱۱/۲۷ ---
-    from app.utils.jalali import _to_ascii, jalali_to_gregorian
-    ascii_t = _to_ascii(t)
     jalali_dates: list[date] = []
-    for jm in re.finditer(r"\b(1[34]\d{2})[/\-](0?[1-9]|1[0-2])[/\-](0?[1-9]|[12]\d|3[01])\b", ascii_t):
+    for jm in _JALALI_YMD.finditer(t):
         try:
             jalali_dates.append(jalali_to_gregorian(int(jm.group(1)), int(jm.group(2)), int(jm.group(3))))
         except ValueError:
             pass
     if not jalali_dates:
-        for jm in re.finditer(r"\b(0?[1-9]|[12]\d|3[01])[/\-](0?[1-9]|1[0-2])[/\-](1[34]\d{2})\b", ascii_t):
+        for jm in _JALALI_DMY.finditer(t):
             try:
                 jalali_dates.append(jalali_to_gregorian(int(jm.group(3)), int(jm.group(2)), int(jm.group(1))))
             except ValueError:
@@ -97,12 +149,13 @@ def _extract_dates(text: str, today: date | None = None) -> tuple[date | None, d
         return (None, jalali_dates[0])
 
     # --- Jalali month name: "27 بهمن 1404" or "بهمن 1404" ---
-    jd = try_parse_jalali(text)
+    # Every numeric Jalali candidate already failed above.
+    jd = try_parse_jalali_month_name(t)
     if jd:
         return (None, jd)
 
     # ISO explicit dates (one date = to_date)
-    iso = re.findall(r"\b(\d{4}-\d{2}-\d{2})\b", t)
+    iso = _ISO_DATE.findall(t)
     if len(iso) >= 2:
         try:
             d1 = date.fromisoformat(iso[0])
@@ -117,35 +170,17 @@ def _extract_dates(text: str, today: date | None = None) -> tuple[date | None, d
         except ValueError:
             pass
 
-    for k in (
-        "today",
-        "امروز",
-        "yesterday",
-        "دیروز",
-        "this month",
-        "این ماه",
-        "last month",
-        "ماه قبل",
-        "ماه گذشته",
-        "this year",
-        "امسال",
-        "از اول سال",
-        "last week",
-        "هفته قبل",
-        "هفته گذشته",
-        "three months",
-        "last 3 months",
-        "سه ماه اخیر",
-    ):
-        p = period_for_keyword(k, today=now)
-        if p and k in t:
-            return p.from_date, p.to_date
+    for k in _PERIOD_KEYWORDS:
+        if k in t:
+            p = period_for_keyword(k, today=now)
+            if p:
+                return p.from_date, p.to_date
 
-    m_days = re.search(r"\blast\s+(\d{1,3})\s+days?\b", t)
+    m_days = _LAST_N_DAYS.search(t)
     if m_days:
         n = max(1, int(m_days.group(1)))
         return now - timedelta(days=n), now
-    m_months = re.search(r"\blast\s+(\d{1,2})\s+months?\b", t)
+    m_months = _LAST_N_MONTHS.search(t)
     if m_months:
         n = max(1, int(m_months.group(1)))
         return now - timedelta(days=30 * n), now
@@ -153,28 +188,29 @@ def _extract_dates(text: str, today: date | None = None) -> tuple[date | None, d
 
 
 def _extract_account_code(text: str) -> str | None:
-    m = re.search(r"\b(1[0-9]{3}|2[0-9]{3}|3[0-9]{3}|4[0-9]{3}|5[0-9]{3}|6[0-9]{3}|7[0-9]{3}|8[0-9]{3}|9[0-9]{3})\b", text or "")
+    m = _ACCOUNT_CODE.search(text or "")
     if m:
         return m.group(1)
     return None
 
 
-_NOT_A_BANK = {"the", "a", "an", "my", "our", "your", "this", "that", "in", "on", "at", "to", "from", "with", "for", "is", "it"}
+# Checked before titlecasing, so a rejected capture never gets a titled copy.
+_NOT_A_BANK = frozenset({"the", "a", "an", "my", "our", "your", "this", "that", "in", "on", "at", "to", "from", "with", "for", "is", "it"})
 
 
 def _extract_bank_name(text: str) -> str | None:
     raw = text or ""
-    m_en2_all = list(re.finditer(r"\b([A-Za-z][A-Za-z0-9]{1,30})\s+bank\b", raw, re.IGNORECASE))
+    m_en2_all = list(_BANK_NAME_BEFORE.finditer(raw))
     if m_en2_all:
-        name = _cleanup_bank_name(m_en2_all[-1].group(1)).title()
+        name = _cleanup_bank_name(m_en2_all[-1].group(1))
         if name.lower() not in _NOT_A_BANK:
-            return name
-    m_en = re.search(r"\b(?:bank)\s+([A-Za-z][A-Za-z0-9\s]{1,30})", raw, re.IGNORECASE)
+            return name.title()
+    m_en = _BANK_NAME_AFTER.search(raw)
     if m_en:
-        name = _cleanup_bank_name(m_en.group(1)).title()
+        name = _cleanup_bank_name(m_en.group(1))
         if name.lower() not in _NOT_A_BANK:
-            return name
-    m_fa = re.search(r"بانک\s+([آ-یA-Za-z0-9\s]{1,30})", raw)
+            return name.title()
+    m_fa = _BANK_NAME_FA.search(raw)
     if m_fa:
         name = _cleanup_bank_name(m_fa.group(1))
         if name.lower() not in _NOT_A_BANK:
@@ -184,9 +220,9 @@ def _extract_bank_name(text: str) -> str | None:
 
 def _extract_limit(text: str) -> int | None:
     raw = text or ""
-    m = re.search(r"\b(?:last|latest)\s+(\d{1,3})\b", raw, re.IGNORECASE)
+    m = _LIMIT_AFTER.search(raw)
     if not m:
-        m = re.search(r"\b(\d{1,3})\s+(?:latest|last)\b", raw, re.IGNORECASE)
+        m = _LIMIT_BEFORE.search(raw)
     if m:
         try:
             n = int(m.group(1))
@@ -197,31 +233,45 @@ def _extract_limit(text: str) -> int | None:
     return None
 
 
+# Reports named outright, checked before anything else: (key, English
+# phrases matched against the normalized text, Persian phrases matched
+# against the raw text).
+_NAMED_REPORTS: tuple[tuple[str, tuple[str, ...], tuple[str, ...]], ...] = (
+    ("balance_sheet", ("balance sheet",), ("ترازنامه",)),
+    ("income_statement", ("income statement", "profit and loss"), ("سود و زیان",)),
+    ("cash_flow", ("cash flow",), ("جریان وجوه نقد",)),
+    ("general_journal", ("general journal",), ("دفتر روزنامه",)),
+    ("general_ledger", ("general ledger",), ("دفتر کل",)),
+    ("trial_balance", ("trial balance",), ("مرور حساب", "تراز آزمایشی")),
+)
+
+
 def parse_report_intent(text: str, today: date | None = None) -> ReportIntent | None:
-    t = (text or "").strip()
+    # The chat endpoint re-parses every earlier user message on each turn when
+    # looking for a follow-up, so results are memoized per (text, day).
+    return _parse_report_intent(text or "", today or date.today())
+
+
+@lru_cache(maxsize=512)
+def _parse_report_intent(text: str, today: date) -> ReportIntent | None:
+    t = text.strip()
     if not t:
         return None
     low = _normalize_text(t)
-    from_date, to_date = _extract_dates(low, today=today)
-    account_code = _extract_account_code(t)
-    bank_name = _extract_bank_name(t)
-    limit = _extract_limit(t)
-
-    # Financial statements
-    if ("balance sheet" in low) or ("ترازنامه" in t):
-        return ReportIntent(key="balance_sheet", from_date=from_date, to_date=to_date)
-    if ("income statement" in low) or ("profit and loss" in low) or ("سود و زیان" in t):
-        return ReportIntent(key="income_statement", from_date=from_date, to_date=to_date)
-    if ("cash flow" in low) or ("جریان وجوه نقد" in t):
-        return ReportIntent(key="cash_flow", from_date=from_date, to_date=to_date)
-
-    # Books / ledgers
-    if ("general journal" in low) or ("دفتر روزنامه" in t):
-        return ReportIntent(key="general_journal", from_date=from_date, to_date=to_date)
-    if ("general ledger" in low) or ("دفتر کل" in t):
-        return ReportIntent(key="general_ledger", from_date=from_date, to_date=to_date)
-    if ("trial balance" in low) or ("مرور حساب" in t) or ("تراز آزمایشی" in t):
-        return ReportIntent(key="trial_balance", from_date=from_date, to_date=to_date)
+    # Most chat messages are not report requests, so the extractors (dates,
+    # with Jalali parsing, above all) run only once a branch needs them.
+    period = cache(partial(_extract_dates, low, today=today))
+    bank_name = cache(partial(_extract_bank_name, t))
+
+    def intent(key: str, **extra) -> ReportIntent:
+        from_date, to_date = period()
+        return ReportIntent(key=key, from_date=from_date, to_date=to_date, **extra)
+
+    # Financial statements, books / ledgers
+    for key, phrases, phrases_fa in _NAMED_REPORTS:
+        if any(p in low for p in phrases) or any(p in t for p in phrases_fa):
+            return intent(key)
+
     if (
         ("account ledger" in low)
         or ("گردش حساب" in t)
@@ -231,89 +281,72 @@ def parse_report_intent(text: str, today: date | None = None) -> ReportIntent |
         or (("bank statement" in low) or ("bank balance" in low))
         or (("گردش" in t) and ("بانک" in t))
     ):
-        return ReportIntent(
-            key="account_ledger",
-            from_date=from_date,
-            to_date=to_date,
-            account_code=account_code,
-            bank_name=bank_name,
-        )
+        return intent("account_ledger", account_code=_extract_account_code(t), bank_name=bank_name())
 
     # "balance of mellat bank", "current balance mellat bank", "show me the balance"
-    if "balance" in low and bank_name:
-        return ReportIntent(
-            key="account_ledger",
-            from_date=from_date,
-            to_date=to_date,
-            account_code=account_code,
-            bank_name=bank_name,
-        )
+    if "balance" in low and bank_name():
+        return intent("account_ledger", account_code=_extract_account_code(t), bank_name=bank_name())
     # Bare "current balance" / "what is the balance" / "how much do i have" without bank
     is_balance_query = (
-        (re.search(r"\b(?:current\s+)?balance\b", low) and "inventory" not in low and "trial" not in low)
-        or re.search(r"\bhow much\b.*\b(?:money|have|bank|cash|in the bank)\b", low)
-        or re.search(r"\b(?:whats?|what'?s)\s+my\s+(?:cash|money|balance)\b", low)
-        or re.search(r"\btotal\s+(?:money|cash|balance)\b", low)
+        (_BALANCE.search(low) and "inventory" not in low and "trial" not in low)
+        or _HOW_MUCH_MONEY.search(low)
+        or _WHATS_MY_MONEY.search(low)
+        or _TOTAL_MONEY.search(low)
     )
-    if is_balance_query and not bank_name:
-        return ReportIntent(
-            key="account_ledger",
-            from_date=from_date,
-            to_date=to_date,
-            account_code=account_code or "1110",
-        )
+    if is_balance_query and not bank_name():
+        return intent("account_ledger", account_code=_extract_account_code(t) or "1110")
 
     # "who owes me" / "how much i owe" → debtor/creditor
-    if re.search(r"\b(?:who\s+owes?|owes?\s+me|owe\s+to|how much\s+(?:do\s+)?i\s+owe)\b", low):
-        return ReportIntent(key="debtor_creditor", from_date=from_date, to_date=to_date)
+    if _WHO_OWES.search(low):
+        return intent("debtor_creditor")
 
     # "expenses this month" / "what did i spend" → income statement (shows expense breakdown)
-    if re.search(r"\b(?:expenses?|spending|spent|spend)\b", low) and re.search(r"\b(?:this|last|show|what|how much|my)\b", low):
-        return ReportIntent(key="income_statement", from_date=from_date, to_date=to_date)
+    if _EXPENSE_WORDS.search(low) and _EXPENSE_CONTEXT.search(low):
+        return intent("income_statement")
 
     # "revenue this month" / "how much did i earn/make"
-    if re.search(r"\b(?:revenue|income|earn(?:ed|ings?)?|mak(?:e|ing)|sold)\b", low) and re.search(r"\b(?:this|last|show|what|how much|my|total)\b", low):
+    if _REVENUE_WORDS.search(low) and _REVENUE_CONTEXT.search(low):
         if "income statement" not in low:
-            return ReportIntent(key="income_statement", from_date=from_date, to_date=to_date)
+            return intent("income_statement")
 
     # Bank transaction listing aliases (e.g. "show me 10 latest transactions of Mellat bank")
-    if bank_name and (
+    if (
         ("transaction" in low)
         or ("transactions" in low)
         or ("txns" in low)
         or ("trxn" in low)
         or ("تراکنش" in t)
         or ("آخرین" in t)
-    ):
-        effective_from = from_date
-        effective_to = to_date
-        if limit and (from_date is None and to_date is None):
+    ) and bank_name():
+        limit = _extract_limit(t)
+        effective_from, effective_to = period()
+        if limit and (effective_from is None and effective_to is None):
             # For "latest N" queries with no explicit period, search all-time.
             effective_from = date(1900, 1, 1)
         return ReportIntent(
             key="account_ledger",
             from_date=effective_from,
             to_date=effective_to,
-            account_code=account_code,
-            bank_name=bank_name,
+            account_code=_extract_account_code(t),
+            bank_name=bank_name(),
             limit=limit or 10,
         )
 
     # Inventory
     if (("inventory" in low) and ("movement" in low)) or ("گردش انبار" in t):
-        return ReportIntent(key="inventory_movement", from_date=from_date, to_date=to_date)
+        return intent("inventory_movement")
     if (("inventory" in low) and ("balance" in low)) or ("موجودی انبار" in t):
-        return ReportIntent(key="inventory_balance", from_date=from_date, to_date=to_date)
+        return intent("inventory_balance")
 
     # Sales / purchases
     if ("sales" in low or "فروش" in t) and (("product" in low) or ("کالا" in t) or ("تفکیک" in t)):
-        return ReportIntent(key="sales_by_product", from_date=from_date, to_date=to_date)
+        return intent("sales_by_product")
     if ("sales" in low or "فروش" in t) and ("invoice" in low or "فاکتور" in t):
-        return ReportIntent(key="sales_by_invoice", from_date=from_date, to_date=to_date)
+        return intent("sales_by_invoice")
     if ("purchase" in low or "خرید" in t) and (("product" in low) or ("کالا" in t) or ("تفکیک" in t)):
-        return ReportIntent(key="purchase_by_product", from_date=from_date, to_date=to_date)
+        return intent("purchase_by_product")
     if ("purchase" in low or "خرید" in t) and ("invoice" in low or "فاکتور" in t):
-        return ReportIntent(key="purchase_by_invoice", from_date=from_date, to_date=to_date)
+        return intent("purchase_by_invoice")
 
     # AR/AP
     if (
@@ -324,21 +357,18 @@ def parse_report_intent(text: str, today: date | None = None) -> ReportIntent |
         or "بدهکار" in t
         or "بستانکار" in t
     ):
-        return ReportIntent(key="debtor_creditor", from_date=from_date, to_date=to_date)
+        return intent("debtor_creditor")
 
     # "transactions on <date>" without bank → general journal for that date
-    if (
-        ("transaction" in low or "transactions" in low or "تراکنش" in t)
-        and not bank_name
-        and (from_date is not None or to_date is not None)
-    ):
-        return ReportIntent(key="general_journal", from_date=from_date, to_date=to_date)
+    if ("transaction" in low or "transactions" in low or "تراکنش" in t) and not bank_name():
+        from_date, to_date = period()
+        if from_date is not None or to_date is not None:
+            return ReportIntent(key="general_journal", from_date=from_date, to_date=to_date)
 
     # Convenient query aliases used in chat
-    if (("last transaction" in low) or ("lates transaction" in low) or ("latest transaction" in low)) and not bank_name:
-        effective_from = from_date
-        effective_to = to_date
-        if from_date is None and to_date is None:
+    if (("last transaction" in low) or ("lates transaction" in low) or ("latest transaction" in low)) and not bank_name():
+        effective_from, effective_to = period()
+        if effective_from is None and effective_to is None:
             effective_from = date(1900, 1, 1)
         return ReportIntent(key="general_journal", from_date=effective_from, to_date=effective_to, limit=1)
     return None
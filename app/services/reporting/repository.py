@@ -1,9 +1,10 @@
 from __future__ import annotations
 
-from datetime import date
+from collections.abc import Iterable
+from datetime import date, timedelta
 from uuid import UUID
 
-from sqlalchemy import func, select
+from sqlalchemy import Row, case, func, or_, select
 from sqlalchemy.orm import Session, selectinload
 
 from app.models.account import Account
@@ -25,6 +26,20 @@ def list_accounts(db: Session) -> list[Account]:
     return db.execute(select(Account).order_by(Account.code)).scalars().all()
 
 
+# Leading digits of every account that can land on the income statement:
+# revenue (4) and expenses (5-9, Iranian and UK charts alike).
+INCOME_STATEMENT_CODE_HEADS = ("4", "5", "6", "7", "8", "9")
+
+
+def list_accounts_for_income(db: Session) -> list[Account]:
+    q = (
+        select(Account)
+        .where(or_(*(Account.code.like(f"{head}%") for head in INCOME_STATEMENT_CODE_HEADS)))
+        .order_by(Account.code)
+    )
+    return db.execute(q).scalars().all()
+
+
 def distinct_currencies(db: Session, from_date: date | None = None, to_date: date | None = None) -> list[str]:
     """Distinct non-deleted transaction currencies, optionally within a date window."""
     q = select(Transaction.currency).where(Transaction.deleted_at.is_(None))
@@ -83,23 +98,60 @@ def account_turnovers_upto(db: Session, to_date: date, currency: str | None = No
     return [(a, int(d or 0), int(c or 0)) for a, d, c in db.execute(q).all()]
 
 
-def paged_journal_entries(db: Session, from_date: date, to_date: date, page: int, page_size: int, currency: str | None = None) -> tuple[int, list[Transaction]]:
+def _count_past_end(db: Session, count_q, offset: int) -> int:
+    """Total for a page that came back empty.
+
+    Paged queries read their total from ``COUNT(*) OVER ()`` on the page rows,
+    so the separate count only runs when there are no rows to carry it, and
+    not at all for an empty first page."""
+    return int(db.execute(count_q).scalar() or 0) if offset else 0
+
+
+def paged_journal_entries(
+    db: Session, from_date: date, to_date: date, page: int, page_size: int, currency: str | None = None
+) -> tuple[int, list[tuple[Row, list[tuple[str, str, int, int, str | None]]]]]:
+    """Return ``(total, [(header, lines), ...])`` for one page of entries.
+
+    Plain columns, not ORM entities: a header row carries ``id, date,
+    reference, description`` and each line is ``(account_code, account_name,
+    debit, credit, line_description)``."""
     base_where = [Transaction.date >= from_date, Transaction.date <= to_date, Transaction.deleted_at.is_(None)]
     if currency:
         base_where.append(Transaction.currency == currency)
-    count_q = select(func.count(Transaction.id)).where(*base_where)
-    total = int(db.execute(count_q).scalar() or 0)
     offset = max(0, (page - 1) * page_size)
     q = (
-        select(Transaction)
+        select(
+            Transaction.id,
+            Transaction.date,
+            Transaction.reference,
+            Transaction.description,
+            func.count().over().label("total"),
+        )
         .where(*base_where)
         .order_by(Transaction.date.desc(), Transaction.created_at.desc())
-        .options(selectinload(Transaction.lines).selectinload(TransactionLine.account))
         .offset(offset)
         .limit(page_size)
     )
-    rows = db.execute(q).scalars().unique().all()
-    return total, rows
+    headers = db.execute(q).all()
+    if not headers:
+        return _count_past_end(db, select(func.count(Transaction.id)).where(*base_where), offset), []
+    total = int(headers[0].total)
+    lines_q = (
+        select(
+            TransactionLine.transaction_id,
+            Account.code,
+            Account.name,
+            TransactionLine.debit,
+            TransactionLine.credit,
+            TransactionLine.line_description,
+        )
+        .join(Account, Account.id == TransactionLine.account_id)
+        .where(TransactionLine.transaction_id.in_([h.id for h in headers]))
+    )
+    lines_by_txn: dict[UUID, list[tuple[str, str, int, int, str | None]]] = {h.id: [] for h in headers}
+    for transaction_id, *line in db.execute(lines_q).all():
+        lines_by_txn[transaction_id].append(tuple(line))
+    return total, [(h, lines_by_txn[h.id]) for h in headers]
 
 
 def paged_account_lines(
@@ -110,10 +162,39 @@ def paged_account_lines(
     page: int,
     page_size: int,
     currency: str | None = None,
-) -> tuple[Account | None, int, list[tuple[TransactionLine, Transaction]]]:
-    acc = db.execute(select(Account).where(Account.code == account_code.strip())).scalars().one_or_none()
-    if not acc:
-        return None, 0, []
+) -> tuple[Account | None, int, tuple[int, int], list[Row]]:
+    """Return ``(account, total, (opening_debit, opening_credit), page_rows)``.
+
+    The account, its opening turnovers before ``from_date`` and the period's
+    line count come back from a single query (correlated scalar subqueries on
+    the account row); the page itself is the second and last round trip. Page
+    rows are plain columns: ``date, id, reference, description, debit,
+    credit, line_description`` and ``cumulative_net``, debit minus credit over
+    the period up to and including that line."""
+    live = [TransactionLine.account_id == Account.id, Transaction.deleted_at.is_(None)]
+    if currency:
+        live.append(Transaction.currency == currency)
+
+    def line_scalar(column, *where):
+        return (
+            select(column)
+            .select_from(TransactionLine)
+            .join(Transaction, Transaction.id == TransactionLine.transaction_id)
+            .where(*live, *where)
+            .scalar_subquery()
+        )
+
+    header_q = select(
+        Account,
+        line_scalar(func.coalesce(func.sum(TransactionLine.debit), 0), Transaction.date < from_date),
+        line_scalar(func.coalesce(func.sum(TransactionLine.credit), 0), Transaction.date < from_date),
+        line_scalar(func.count(TransactionLine.id), Transaction.date >= from_date, Transaction.date <= to_date),
+    ).where(Account.code == account_code.strip())
+    header = db.execute(header_q).one_or_none()
+    if header is None:
+        return None, 0, (0, 0), []
+    acc, opening_debit, opening_credit, total = header
+
     where_clauses = [
         TransactionLine.account_id == acc.id,
         Transaction.date >= from_date,
@@ -122,118 +203,149 @@ def paged_account_lines(
     ]
     if currency:
         where_clauses.append(Transaction.currency == currency)
-    count_q = (
-        select(func.count(TransactionLine.id))
-        .join(Transaction, Transaction.id == TransactionLine.transaction_id)
-        .where(*where_clauses)
-    )
-    total = int(db.execute(count_q).scalar() or 0)
+    order = (Transaction.date, Transaction.created_at, TransactionLine.id)
+    # Evaluated over every line in the period before OFFSET/LIMIT apply, so
+    # later pages carry the movement of the pages before them.
+    cumulative_net = func.sum(TransactionLine.debit - TransactionLine.credit).over(order_by=order)
     offset = max(0, (page - 1) * page_size)
     q = (
-        select(TransactionLine, Transaction)
+        select(
+            Transaction.date,
+            Transaction.id,
+            Transaction.reference,
+            Transaction.description,
+            TransactionLine.debit,
+            TransactionLine.credit,
+            TransactionLine.line_description,
+            cumulative_net.label("cumulative_net"),
+        )
         .join(Transaction, Transaction.id == TransactionLine.transaction_id)
         .where(*where_clauses)
-        .order_by(Transaction.date, Transaction.created_at, TransactionLine.id)
+        .order_by(*order)
         .offset(offset)
         .limit(page_size)
     )
     rows = db.execute(q).all()
-    return acc, total, rows
+    return acc, int(total or 0), (int(opening_debit or 0), int(opening_credit or 0)), rows
 
 
-def opening_balance_before(
-    db: Session,
-    account_id: UUID,
-    before_date: date,
-    currency: str | None = None,
-) -> tuple[int, int]:
+def trial_balance_rows(db: Session, from_date: date, to_date: date, currency: str | None = None) -> list[tuple[str, str, int, int]]:
     q = (
         select(
-            func.coalesce(func.sum(TransactionLine.debit), 0),
-            func.coalesce(func.sum(TransactionLine.credit), 0),
+            Account.code,
+            Account.name,
+            func.coalesce(func.sum(TransactionLine.debit), 0).label("debit_turnover"),
+            func.coalesce(func.sum(TransactionLine.credit), 0).label("credit_turnover"),
         )
+        .join(TransactionLine, TransactionLine.account_id == Account.id)
         .join(Transaction, Transaction.id == TransactionLine.transaction_id)
-        .where(TransactionLine.account_id == account_id, Transaction.date < before_date, Transaction.deleted_at.is_(None))
+        .where(Transaction.date >= from_date, Transaction.date <= to_date, Transaction.deleted_at.is_(None))
+        .group_by(Account.code, Account.name)
+        .order_by(Account.code)
     )
     q = _currency_filter(q, currency)
-    d, c = db.execute(q).one()
-    return int(d or 0), int(c or 0)
+    return [(code, name, int(d or 0), int(c or 0)) for code, name, d, c in db.execute(q).all()]
 
 
-def trial_balance_rows(db: Session, from_date: date, to_date: date, currency: str | None = None) -> list[tuple[str, str, int, int]]:
-    q = (
+def paged_trial_balance_rows(
+    db: Session,
+    from_date: date,
+    to_date: date,
+    page: int,
+    page_size: int,
+    currency: str | None = None,
+) -> tuple[int, list[tuple[str, str, int, int]], tuple[int, int, int, int]]:
+    """One page of ``trial_balance_rows`` plus the row count and report-wide
+    totals ``(debit_turnover, credit_turnover, debit_balance, credit_balance)``,
+    all computed in SQL so only the page is materialized."""
+    debit_turnover = func.coalesce(func.sum(TransactionLine.debit), 0)
+    credit_turnover = func.coalesce(func.sum(TransactionLine.credit), 0)
+    grouped = (
         select(
             Account.code,
             Account.name,
-            func.coalesce(func.sum(TransactionLine.debit), 0).label("debit_turnover"),
-            func.coalesce(func.sum(TransactionLine.credit), 0).label("credit_turnover"),
+            debit_turnover.label("debit_turnover"),
+            credit_turnover.label("credit_turnover"),
         )
         .join(TransactionLine, TransactionLine.account_id == Account.id)
         .join(Transaction, Transaction.id == TransactionLine.transaction_id)
         .where(Transaction.date >= from_date, Transaction.date <= to_date, Transaction.deleted_at.is_(None))
         .group_by(Account.code, Account.name)
-        .order_by(Account.code)
     )
-    q = _currency_filter(q, currency)
-    return [(code, name, int(d or 0), int(c or 0)) for code, name, d, c in db.execute(q).all()]
+    grouped = _currency_filter(grouped, currency)
+
+    sub = grouped.subquery()
+    net = sub.c.debit_turnover - sub.c.credit_turnover
+    totals_q = select(
+        func.count(),
+        func.coalesce(func.sum(sub.c.debit_turnover), 0),
+        func.coalesce(func.sum(sub.c.credit_turnover), 0),
+        func.coalesce(func.sum(case((net > 0, net), else_=0)), 0),
+        func.coalesce(func.sum(case((net < 0, -net), else_=0)), 0),
+    )
+    count, td_turn, tc_turn, td_bal, tc_bal = db.execute(totals_q).one()
+
+    offset = max(0, (page - 1) * page_size)
+    page_q = grouped.order_by(Account.code).offset(offset).limit(page_size)
+    rows = [(code, name, int(d or 0), int(c or 0)) for code, name, d, c in db.execute(page_q).all()]
+    return int(count or 0), rows, (int(td_turn), int(tc_turn), int(td_bal), int(tc_bal))
 
 
-def debtor_creditor_movements(db: Session, from_date: date, to_date: date, currency: str | None = None) -> list[tuple[date, str, UUID | None, str, int]]:
+def debtor_creditor_aging(db: Session, from_date: date, to_date: date, currency: str | None = None) -> list[tuple[str, UUID, str, int, int, int, int, int]]:
     """
-    Return tuple:
-    (txn_date, role, entity_id, entity_name, delta)
+    Return one row per entity with a positive open balance:
+    (role, entity_id, entity_name, current, days_31_60, days_61_90, days_90_plus, total)
     role: debtor | creditor
-    delta positive means increase, negative decrease.
+    Buckets age each movement against ``to_date``. Both roles come from one
+    grouped scan; debtors come first, each role ordered by total, largest
+    first.
     """
+    # Movement dates on or after each cutoff are at most 30 / 60 / 90 days old.
+    cut_30, cut_60, cut_90 = (to_date - timedelta(days=days) for days in (30, 60, 90))
+
     # Receivable (1112): debit increases debtors, credit decreases.
-    ar_q = (
-        select(
-            Transaction.date,
-            TransactionEntity.entity_id,
-            Entity.name,
-            (func.coalesce(func.sum(TransactionLine.debit), 0) - func.coalesce(func.sum(TransactionLine.credit), 0)).label("delta"),
-        )
-        .join(TransactionLine, TransactionLine.transaction_id == Transaction.id)
-        .join(TransactionEntity, TransactionEntity.transaction_id == Transaction.id)
-        .join(Entity, Entity.id == TransactionEntity.entity_id)
-        .where(
-            Transaction.date >= from_date,
-            Transaction.date <= to_date,
-            Transaction.deleted_at.is_(None),
-            TransactionLine.account_id == select(Account.id).where(Account.code == "1112").scalar_subquery(),
-            TransactionEntity.role.in_(("client",)),
-        )
-        .group_by(Transaction.date, TransactionEntity.entity_id, Entity.name)
-    )
-    ar_q = _currency_filter(ar_q, currency)
+    receivable = (Account.code == "1112") & (TransactionEntity.role == "client")
     # Payable (21xx): credit increases creditors, debit decreases.
-    ap_q = (
+    payable = Account.code.like("21%") & TransactionEntity.role.in_(("supplier", "payee"))
+    role = case((receivable, "debtor"), else_="creditor")
+    delta = case(
+        (receivable, TransactionLine.debit - TransactionLine.credit),
+        else_=TransactionLine.credit - TransactionLine.debit,
+    )
+
+    def bucket(cond):
+        return func.coalesce(func.sum(case((cond, delta), else_=0)), 0)
+
+    total = func.coalesce(func.sum(delta), 0)
+    q = (
         select(
-            Transaction.date,
-            TransactionEntity.entity_id,
+            role,
+            Entity.id,
             Entity.name,
-            (func.coalesce(func.sum(TransactionLine.credit), 0) - func.coalesce(func.sum(TransactionLine.debit), 0)).label("delta"),
+            bucket(Transaction.date >= cut_30),
+            bucket((Transaction.date < cut_30) & (Transaction.date >= cut_60)),
+            bucket((Transaction.date < cut_60) & (Transaction.date >= cut_90)),
+            bucket(Transaction.date < cut_90),
+            total,
         )
+        .select_from(Transaction)
         .join(TransactionLine, TransactionLine.transaction_id == Transaction.id)
+        .join(Account, Account.id == TransactionLine.account_id)
         .join(TransactionEntity, TransactionEntity.transaction_id == Transaction.id)
         .join(Entity, Entity.id == TransactionEntity.entity_id)
-        .join(Account, Account.id == TransactionLine.account_id)
         .where(
             Transaction.date >= from_date,
             Transaction.date <= to_date,
             Transaction.deleted_at.is_(None),
-            Account.code.like("21%"),
-            TransactionEntity.role.in_(("supplier", "payee")),
+            receivable | payable,
         )
-        .group_by(Transaction.date, TransactionEntity.entity_id, Entity.name)
+        .group_by(role, Entity.id, Entity.name)
+        .having(total > 0)
+        # "debtor" sorts after "creditor", so descending puts debtors first.
+        .order_by(role.desc(), total.desc(), Entity.name)
     )
-    ap_q = _currency_filter(ap_q, currency)
-    out: list[tuple[date, str, UUID | None, str, int]] = []
-    for d, eid, name, delta in db.execute(ar_q).all():
-        out.append((d, "debtor", eid, name or "Unassigned", int(delta or 0)))
-    for d, eid, name, delta in db.execute(ap_q).all():
-        out.append((d, "creditor", eid, name or "Unassigned", int(delta or 0)))
-    return out
+    q = _currency_filter(q, currency)
+    return [(r, eid, name or "Unassigned", *(int(v) for v in amounts)) for r, eid, name, *amounts in db.execute(q).all()]
 
 
 def list_inventory_items(db: Session) -> list[InventoryItem]:
@@ -254,26 +366,52 @@ def paged_inventory_movements(
     )
     if item_id:
         base = base.where(InventoryMovement.item_id == item_id)
-    count_q = select(func.count()).select_from(base.subquery())
-    total = int(db.execute(count_q).scalar() or 0)
     offset = max(0, (page - 1) * page_size)
     rows = db.execute(
-        base.order_by(InventoryMovement.movement_date.desc(), InventoryMovement.created_at.desc()).offset(offset).limit(page_size)
+        base.add_columns(func.count().over())
+        .order_by(InventoryMovement.movement_date.desc(), InventoryMovement.created_at.desc())
+        .offset(offset)
+        .limit(page_size)
     ).all()
-    return total, rows
+    if not rows:
+        return _count_past_end(db, select(func.count()).select_from(base.subquery()), offset), []
+    return int(rows[0][2]), [(mv, item) for mv, item, _total in rows]
 
 
-def inventory_movements_for_balance(db: Session, to_date: date) -> list[tuple[InventoryMovement, InventoryItem]]:
+def inventory_movements_for_balance(db: Session, to_date: date, batch_size: int = 1024) -> Iterable[Row]:
+    """Date-ordered ``(item_id, movement_type, quantity, unit_cost)`` rows,
+    streamed in batches; item metadata comes from :func:`inventory_items_by_id`
+    once the stream is consumed, rather than joined onto every movement."""
     q = (
-        select(InventoryMovement, InventoryItem)
-        .join(InventoryItem, InventoryItem.id == InventoryMovement.item_id)
+        select(
+            InventoryMovement.item_id,
+            InventoryMovement.movement_type,
+            InventoryMovement.quantity,
+            InventoryMovement.unit_cost,
+        )
         .where(InventoryMovement.movement_date <= to_date)
         .order_by(InventoryMovement.movement_date, InventoryMovement.created_at, InventoryMovement.id)
+        .execution_options(yield_per=batch_size)
     )
-    return db.execute(q).all()
+    return db.execute(q)
+
+
+def inventory_items_by_id(db: Session, item_ids: Iterable[UUID]) -> dict[UUID, Row]:
+    """``(id, name, sku, unit)`` of the given items. Ids with no item row (the
+    item was deleted meanwhile) are absent from the result."""
+    ids = list(item_ids)
+    if not ids:
+        return {}
+    q = select(InventoryItem.id, InventoryItem.name, InventoryItem.sku, InventoryItem.unit).where(
+        InventoryItem.id.in_(ids)
+    )
+    return {item.id: item for item in db.execute(q).all()}
 
 
-def sales_items_between(db: Session, from_date: date, to_date: date, currency: str | None = None) -> list[tuple[InvoiceItem, Invoice]]:
+def sales_items_between(
+    db: Session, from_date: date, to_date: date, currency: str | None = None, batch_size: int = 1024
+) -> Iterable[tuple[InvoiceItem, Invoice]]:
+    """``(item, invoice)`` pairs, streamed in batches; iterate once."""
     q = (
         select(InvoiceItem, Invoice)
         .join(Invoice, Invoice.id == InvoiceItem.invoice_id)
@@ -283,13 +421,17 @@ def sales_items_between(db: Session, from_date: date, to_date: date, currency: s
             Invoice.issue_date <= to_date,
         )
         .order_by(Invoice.issue_date.desc(), Invoice.number.desc())
+        .execution_options(yield_per=batch_size)
     )
     if currency:
         q = q.where(Invoice.currency == currency)
-    return db.execute(q).all()
+    return db.execute(q)
 
 
-def purchase_items_between(db: Session, from_date: date, to_date: date, currency: str | None = None) -> list[tuple[InvoiceItem, Invoice]]:
+def purchase_items_between(
+    db: Session, from_date: date, to_date: date, currency: str | None = None, batch_size: int = 1024
+) -> Iterable[tuple[InvoiceItem, Invoice]]:
+    """``(item, invoice)`` pairs, streamed in batches; iterate once."""
     q = (
         select(InvoiceItem, Invoice)
         .join(Invoice, Invoice.id == InvoiceItem.invoice_id)
@@ -299,15 +441,59 @@ def purchase_items_between(db: Session, from_date: date, to_date: date, currency
             Invoice.issue_date <= to_date,
         )
         .order_by(Invoice.issue_date.desc(), Invoice.number.desc())
+        .execution_options(yield_per=batch_size)
     )
     if currency:
         q = q.where(Invoice.currency == currency)
-    return db.execute(q).all()
+    return db.execute(q)
 
 
-def invoices_between(db: Session, from_date: date, to_date: date, *, kind: str | None = None, currency: str | None = None) -> list[Invoice]:
+def _items_by_product_between(db: Session, kind: str, from_date: date, to_date: date, currency: str | None) -> list[tuple[str | None, float, int, int]]:
     q = (
-        select(Invoice)
+        select(
+            InvoiceItem.product_name,
+            func.coalesce(func.sum(InvoiceItem.quantity), 0),
+            func.coalesce(func.sum(InvoiceItem.line_total), 0),
+            # Rounded per line; SQL ROUND takes halves away from zero (0.5 x 5 -> 3).
+            func.coalesce(func.sum(func.round(InvoiceItem.quantity * func.coalesce(InvoiceItem.unit_cost, 0))), 0),
+        )
+        .join(Invoice, Invoice.id == InvoiceItem.invoice_id)
+        .where(
+            Invoice.kind == kind,
+            Invoice.issue_date >= from_date,
+            Invoice.issue_date <= to_date,
+        )
+        .group_by(InvoiceItem.product_name)
+    )
+    if currency:
+        q = q.where(Invoice.currency == currency)
+    return [(name, float(qty or 0), int(amount or 0), int(cost or 0)) for name, qty, amount, cost in db.execute(q).all()]
+
+
+def sales_by_product_between(db: Session, from_date: date, to_date: date, currency: str | None = None) -> list[tuple[str | None, float, int, int]]:
+    """``(product_name, quantity, line_total, estimated_cost)`` per raw product name on sales invoices."""
+    return _items_by_product_between(db, "sales", from_date, to_date, currency)
+
+
+def purchase_by_product_between(db: Session, from_date: date, to_date: date, currency: str | None = None) -> list[tuple[str | None, float, int, int]]:
+    """``(product_name, quantity, line_total, estimated_cost)`` per raw product name on purchase invoices."""
+    return _items_by_product_between(db, "purchase", from_date, to_date, currency)
+
+
+def invoices_between(db: Session, from_date: date, to_date: date, *, kind: str | None = None, currency: str | None = None) -> list[Row]:
+    """Plain ``id, number, issue_date, due_date, status, amount, entity_name``
+    rows; the counterparty name comes from a LEFT JOIN, not a second query."""
+    q = (
+        select(
+            Invoice.id,
+            Invoice.number,
+            Invoice.issue_date,
+            Invoice.due_date,
+            Invoice.status,
+            Invoice.amount,
+            Entity.name.label("entity_name"),
+        )
+        .outerjoin(Entity, Entity.id == Invoice.entity_id)
         .where(Invoice.issue_date >= from_date, Invoice.issue_date <= to_date)
         .order_by(Invoice.issue_date.desc(), Invoice.number.desc())
     )
@@ -315,7 +501,7 @@ def invoices_between(db: Session, from_date: date, to_date: date, *, kind: str |
         q = q.where(Invoice.kind == kind)
     if currency:
         q = q.where(Invoice.currency == currency)
-    return db.execute(q).scalars().all()
+    return db.execute(q).all()
 
 
 def latest_transaction(db: Session) -> Transaction | None:
@@ -328,7 +514,11 @@ def latest_transaction(db: Session) -> Transaction | None:
     ).scalars().first()
 
 
-def transactions_with_lines_between(db: Session, from_date: date, to_date: date, currency: str | None = None) -> list[Transaction]:
+def transactions_with_lines_between(
+    db: Session, from_date: date, to_date: date, currency: str | None = None, batch_size: int = 500
+) -> Iterable[Transaction]:
+    """Date-ordered transactions with lines and entity links, streamed in
+    batches (each batch gets its own selectin loads); iterate once."""
     q = (
         select(Transaction)
         .where(Transaction.date >= from_date, Transaction.date <= to_date, Transaction.deleted_at.is_(None))
@@ -337,7 +527,8 @@ def transactions_with_lines_between(db: Session, from_date: date, to_date: date,
             selectinload(Transaction.lines).selectinload(TransactionLine.account),
             selectinload(Transaction.entity_links).selectinload(TransactionEntity.entity),
         )
+        .execution_options(yield_per=batch_size)
     )
     if currency:
         q = q.where(Transaction.currency == currency)
-    return db.execute(q).scalars().unique().all()
+    return db.execute(q).scalars()
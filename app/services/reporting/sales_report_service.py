@@ -1,12 +1,9 @@
 from __future__ import annotations
 
-from collections import defaultdict
 from datetime import date
 
-from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from app.models.entity import Entity
 from app.schemas.manager_report import (
     ReportPeriod,
     SalesByInvoiceRow,
@@ -14,7 +11,25 @@ from app.schemas.manager_report import (
     SalesPurchaseReportResponse,
 )
 from app.services.reporting.common import default_period
-from app.services.reporting.repository import invoices_between, purchase_items_between, sales_items_between
+from app.services.reporting.repository import invoices_between, purchase_by_product_between, sales_by_product_between
+
+
+def _by_product(rows: list[tuple[str | None, float, int, int]]) -> dict[str, tuple[float, int, int]]:
+    """Fold per-name SQL totals onto the display name, merging blank and
+    whitespace-only variants into "Unspecified"."""
+    out: dict[str, tuple[float, int, int]] = {}
+    for name, qty, amount, cost in rows:
+        key = (name or "Unspecified").strip() or "Unspecified"
+        if key in out:
+            q0, a0, c0 = out[key]
+            qty, amount, cost = q0 + qty, a0 + amount, c0 + cost
+        out[key] = (qty, amount, cost)
+    return out
+
+
+def _largest_first(by_product: dict[str, tuple[float, int, int]]) -> list[tuple[str, tuple[float, int, int]]]:
+    """Order on the raw amount before any row model is built."""
+    return sorted(by_product.items(), key=lambda kv: kv[1][1], reverse=True)
 
 
 class SalesReportService:
@@ -23,18 +38,7 @@ class SalesReportService:
 
     def sales_by_product(self, from_date: date | None, to_date: date | None, product_name: str | None = None) -> SalesPurchaseReportResponse:
         period = default_period(from_date, to_date)
-        rows = sales_items_between(self.db, period.from_date, period.to_date)
-        by_product: dict[str, dict[str, float | int]] = defaultdict(
-            lambda: {"quantity": 0.0, "sales_amount": 0, "estimated_cost": 0}
-        )
-        for item, _inv in rows:
-            key = (item.product_name or "Unspecified").strip() or "Unspecified"
-            qty = float(item.quantity or 0)
-            sales = int(item.line_total or 0)
-            unit_cost = int(item.unit_cost or 0)
-            by_product[key]["quantity"] += qty
-            by_product[key]["sales_amount"] += sales
-            by_product[key]["estimated_cost"] += int(round(qty * unit_cost))
+        by_product = _by_product(sales_by_product_between(self.db, period.from_date, period.to_date))
 
         if product_name:
             filter_lower = product_name.lower()
@@ -42,15 +46,13 @@ class SalesReportService:
 
         out: list[SalesByProductRow] = []
         total_sales = total_cost = 0
-        for name, vals in by_product.items():
-            sales = int(vals["sales_amount"])
-            cost = int(vals["estimated_cost"])
+        for name, (qty, sales, cost) in _largest_first(by_product):
             profit = sales - cost
             margin = (profit / sales * 100.0) if sales > 0 else None
             out.append(
-                SalesByProductRow(
+                SalesByProductRow.model_construct(
                     product_name=name,
-                    quantity=round(float(vals["quantity"]), 4),
+                    quantity=round(qty, 4),
                     sales_amount=sales,
                     estimated_cost=cost,
                     profit=profit,
@@ -59,7 +61,6 @@ class SalesReportService:
             )
             total_sales += sales
             total_cost += cost
-        out.sort(key=lambda x: x.sales_amount, reverse=True)
         total_profit = total_sales - total_cost
         return SalesPurchaseReportResponse(
             report_type="sales_by_product",
@@ -75,16 +76,7 @@ class SalesReportService:
 
     def purchase_by_product(self, from_date: date | None, to_date: date | None, product_name: str | None = None) -> SalesPurchaseReportResponse:
         period = default_period(from_date, to_date)
-        rows = purchase_items_between(self.db, period.from_date, period.to_date)
-        by_product: dict[str, dict[str, float | int]] = defaultdict(
-            lambda: {"quantity": 0.0, "amount": 0}
-        )
-        for item, _inv in rows:
-            key = (item.product_name or "Unspecified").strip() or "Unspecified"
-            qty = float(item.quantity or 0)
-            amt = int(item.line_total or 0)
-            by_product[key]["quantity"] += qty
-            by_product[key]["amount"] += amt
+        by_product = _by_product(purchase_by_product_between(self.db, period.from_date, period.to_date))
 
         if product_name:
             filter_lower = product_name.lower()
@@ -92,20 +84,18 @@ class SalesReportService:
 
         out: list[SalesByProductRow] = []
         total_amount = 0
-        for name, vals in by_product.items():
-            amount = int(vals["amount"])
+        for name, (qty, amount, _cost) in _largest_first(by_product):
             total_amount += amount
             out.append(
-                SalesByProductRow(
+                SalesByProductRow.model_construct(
                     product_name=name,
-                    quantity=round(float(vals["quantity"]), 4),
+                    quantity=round(qty, 4),
                     sales_amount=amount,
                     estimated_cost=0,
                     profit=0,
                     margin_pct=None,
                 )
             )
-        out.sort(key=lambda x: x.sales_amount, reverse=True)
         return SalesPurchaseReportResponse(
             report_type="purchase_by_product",
             period=ReportPeriod(from_date=period.from_date, to_date=period.to_date),
@@ -122,23 +112,18 @@ class SalesReportService:
     def _invoice_rows(self, kind: str, from_date: date | None, to_date: date | None, product_name: str | None = None) -> SalesPurchaseReportResponse:
         period = default_period(from_date, to_date)
         invoices = invoices_between(self.db, period.from_date, period.to_date, kind=kind)
-        entity_ids = [inv.entity_id for inv in invoices if inv.entity_id]
-        entities = {}
-        if entity_ids:
-            ents = self.db.execute(select(Entity).where(Entity.id.in_(entity_ids))).scalars().all()
-            entities = {e.id: e for e in ents}
         rows: list[SalesByInvoiceRow] = []
         total = 0
         for inv in invoices:
             total += int(inv.amount or 0)
             rows.append(
-                SalesByInvoiceRow(
+                SalesByInvoiceRow.model_construct(
                     invoice_id=inv.id,
                     invoice_number=inv.number,
                     issue_date=inv.issue_date,
                     due_date=inv.due_date,
                     status=inv.status,
-                    entity_name=(entities.get(inv.entity_id).name if inv.entity_id and entities.get(inv.entity_id) else None),
+                    entity_name=inv.entity_name,
                     amount=int(inv.amount or 0),
                 )
             )
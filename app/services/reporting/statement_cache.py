@@ -0,0 +1,122 @@
+"""In-process cache for financial statement responses.
+
+Statements are pure functions of the ledger, so a response can be reused until
+the ledger moves. Entries are keyed on the statement kind, its resolved
+arguments, the current company and a *ledger version*:
+
+* a process-local generation counter, bumped by an ``after_flush`` hook
+  whenever a transaction, journal line or account is added, changed or
+  deleted through the ORM, and again when that work commits or rolls back —
+  an entry built between another session's flush and its commit read the
+  old rows, so it must not outlive the commit;
+* a cheap DB fingerprint (row counts of transactions, journal lines and
+  accounts, and the latest ``updated_at`` of transactions and accounts), so
+  writes made by another process are noticed too. Journal lines have no
+  timestamp of their own (and a UUID key, so no meaningful maximum), so the
+  same flush hook stamps ``transactions.updated_at`` on the parent of every
+  line it writes; a line-only edit then moves the transactions part.
+
+No explicit invalidation is needed: a stale entry simply stops being hit and
+ages out of the LRU.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+
+from pydantic import BaseModel
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session
+
+from app.db.tenant import get_current_company
+from app.models.account import Account
+from app.models.transaction import Transaction, TransactionLine
+
+_MAXSIZE = 64
+_LEDGER_MODELS = (Transaction, TransactionLine, Account)
+
+_lock = threading.Lock()
+_entries: OrderedDict[tuple, BaseModel] = OrderedDict()
+_generation = 0
+
+
+def _bump_generation() -> None:
+    global _generation
+    with _lock:
+        _generation += 1
+
+
+@event.listens_for(Session, "after_flush")
+def _on_flush(session: Session, flush_context) -> None:
+    changed = [obj for objs in (session.new, session.dirty, session.deleted) for obj in objs]
+    if not any(isinstance(obj, _LEDGER_MODELS) for obj in changed):
+        return
+    session.info["ledger_flushed"] = True
+    _bump_generation()
+    txn_ids = {obj.transaction_id for obj in changed if isinstance(obj, TransactionLine)}
+    txn_ids -= {obj.id for obj in session.deleted if isinstance(obj, Transaction)}
+    txn_ids.discard(None)
+    if txn_ids:
+        session.connection().execute(
+            update(Transaction.__table__).where(Transaction.id.in_(txn_ids)).values(updated_at=func.now())
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def _on_commit(session: Session) -> None:
+    # Entries built by other sessions between this session's flush and commit
+    # read the rows it was replacing.
+    if session.info.pop("ledger_flushed", False):
+        _bump_generation()
+
+
+@event.listens_for(Session, "after_rollback")
+def _on_rollback(session: Session) -> None:
+    # Entries built from this session's flushed-but-uncommitted rows must not
+    # outlive the rollback.
+    if session.info.pop("ledger_flushed", False):
+        _bump_generation()
+
+
+def _ledger_fingerprint(db: Session) -> tuple:
+    q = select(
+        select(func.count(Transaction.id)).scalar_subquery(),
+        select(func.max(Transaction.updated_at)).scalar_subquery(),
+        select(func.count(TransactionLine.id)).scalar_subquery(),
+        select(func.count(Account.id)).scalar_subquery(),
+        select(func.max(Account.updated_at)).scalar_subquery(),
+    )
+    return tuple(db.execute(q).one())
+
+
+def cached_statement[M: BaseModel](
+    db: Session, kind: str, args: tuple[Hashable, ...], build: Callable[[], M]
+) -> M:
+    """Return the statement for ``(kind, args)``, building it on a miss.
+
+    ``args`` must be fully resolved (no ``None`` standing in for "today"),
+    since the cache outlives the day it was filled on. Callers get a deep copy,
+    so mutating a response never leaks into the cache."""
+    generation = _generation
+    key = (kind, args, get_current_company(), generation, _ledger_fingerprint(db))
+    with _lock:
+        hit = _entries.get(key)
+        if hit is not None:
+            _entries.move_to_end(key)
+    if hit is not None:
+        return hit.model_copy(deep=True)
+
+    result = build()
+    with _lock:
+        # A flush while building means the result may mix old and new state.
+        if generation == _generation:
+            _entries[key] = result.model_copy(deep=True)
+            while len(_entries) > _MAXSIZE:
+                _entries.popitem(last=False)
+    return result
+
+
+def clear_statement_cache() -> None:
+    with _lock:
+        _entries.clear()
@@ -17,6 +17,7 @@ structure is always complete.
 from __future__ import annotations
 
 from datetime import date, timedelta
+from uuid import UUID
 
 from sqlalchemy.orm import Session
 
@@ -151,17 +152,13 @@ def _bs_bucket_for_code(code: str) -> tuple[str, str] | None:
     return None
 
 
-def _uk_pl_to_date(
-    db: Session, accounts: list[Account], as_of: date, currency: str | None,
-) -> int:
+def _uk_pl_to_date(accounts: list[Account], turnovers: dict[UUID, tuple[int, int]]) -> int:
     """Net profit/(loss) since inception, computed directly from the P&L
-    accounts. Used to fold un-closed P&L into retained earnings on the BS."""
+    accounts. Used to fold un-closed P&L into retained earnings on the BS;
+    ``turnovers`` is the balance sheet's own as-of map, so this costs no
+    extra query."""
     from app.services.reporting.common import REVENUE, EXPENSE
 
-    turnovers = {
-        account_id: (debit, credit)
-        for account_id, debit, credit in account_turnovers_upto(db, as_of, currency=currency)
-    }
     total = 0
     for acc in accounts:
         acc_type = classify_account_code(acc.code)
@@ -203,7 +200,7 @@ def _uk_balance_sheet_buckets(
         balance = balance_from_turnovers(classify_account_code(acc.code), debit, credit)
         buckets[key] = buckets.get(key, 0) + int(balance)
     # Implicit closing: add un-closed P&L to retained earnings.
-    pl_to_date = _uk_pl_to_date(db, accounts, as_of, currency)
+    pl_to_date = _uk_pl_to_date(accounts, turnovers)
     if pl_to_date:
         buckets[("equity", "eq_pl_account")] = buckets.get(("equity", "eq_pl_account"), 0) + pl_to_date
     return buckets
@@ -3,12 +3,14 @@ from __future__ import annotations
 import re
 import uuid
 from dataclasses import dataclass
-from datetime import date, datetime
+from datetime import date, datetime, time
+from functools import lru_cache
 from typing import Any
 
-from sqlalchemy import select
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import and_, bindparam, inspect, or_, select
+from sqlalchemy.orm import Session
 
+from app.db.tenant import get_current_company
 from app.models.entity import Entity
 from app.models.transaction import Transaction
 from app.models.transaction_fee import (
@@ -84,6 +86,20 @@ _PAYMENT_KEYWORDS = (
     "خرج کردم",
 )
 
+_RECEIPT_PHRASE_HINTS = (
+    "paid us",
+    "pay us",
+    "to us",
+    "received from",
+    "got paid",
+    "be ma",
+    "به ما",
+    "به حساب ما",
+    "واریز کرد",
+    "دریافت کردیم",
+)
+_INBOUND_DESTINATION_HINTS = (" to us", " us ", "our account", "my account", "bank", "بانک", "حساب")
+
 _RECEIPT_KEYWORDS = (
     "received",
     "receipt",
@@ -97,6 +113,68 @@ _RECEIPT_KEYWORDS = (
 )
 
 
+# Arabic forms often seen on Persian keyboards, and half-space and dash
+# variants, folded in one str.translate pass.
+_MATCH_TABLE = str.maketrans({"ي": "ی", "ك": "ک", "\u200c": " ", "-": " "})
+_NON_KEY_CHARS = re.compile(r"[^a-z0-9]+")
+_DIGIT = re.compile(r"\d")
+# Account / IBAN / card numbers, blanked out before looking for an amount.
+_ACCOUNT_NUMBER = re.compile(r"(?:account|acc(?:ount)?|iban|card|شماره\s*حساب|شماره\s*کارت)\s*[:#-]?\s*\d[\d,]{5,}")
+_AMOUNT_KMB = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*([kmb])\b")
+_AMOUNT_WORD = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*(million|billion)\b")
+_AMOUNT_CURRENCY = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*(tomans?|rials?)\b")
+# Currency code/word right after the amount, e.g. "79471400IRR".
+_AMOUNT_TRAILING_CURRENCY = re.compile(
+    r"(?<!\d)(\d[\d,]*(?:\.\d+)?)(?:\s*(?:irr|rial|rials|ریال|ريال|تومان|tomans?))(?!\d)", re.IGNORECASE
+)
+_BARE_NUMBER = re.compile(r"(?<!\d)(\d[\d,]{2,})(?!\d)")
+_PAID_TO = re.compile(r"\b([a-z\u0600-\u06ff][a-z0-9\u0600-\u06ff]*)\s+(?:paid|payed)\s+to\s+(.+)$")
+_VIA_METHOD = re.compile(r"\b(?:via|with|through|using|با)\s+([a-z\u0600-\u06ff][a-z0-9\u0600-\u06ff\-\s]{2,60})\b")
+_LONG_NUMBER = re.compile(r"\d{4,}")
+_BANK_WORD = re.compile(r"\b(?:mellat|melli|tejarat|saderat|saman|parsian|pasargad)\b")
+_VIA_BANK = re.compile(r"\b(?:from|via|through|to)\s+([a-z][a-z0-9\s]{1,40})\s+bank\b")
+# "max 50k toman", "up to 5000", "capped at 2m rials": groups are amount, k/m/b, currency.
+_FEE_CAP = re.compile(
+    r"(?:max(?:imum)?|up\s*to|cap(?:ped)?(?:\s*at)?)\s*(?:of|at)?\s*(\d[\d,]*(?:\.\d+)?)\s*([kmb])?\s*(tomans?|rials?)?"
+)
+_ZERO_AMOUNT = re.compile(r"\s*0+(?:\.0+)?\s*(?:tomans?|rials?)?\s*")
+_BARE_AMOUNT = re.compile(r"\s*\d[\d,]*(?:\.\d+)?\s*(?:tomans?|rials?)?\s*")
+_ZERO_TOKEN = re.compile(r"(?<![\d.])0+(?:\.0+)?(?![\d.])")
+_NON_ZERO_DECIMAL = re.compile(r"\d*\.\d*[1-9]\d*")
+_RECEIPT_PHRASE = re.compile("|".join(map(re.escape, _RECEIPT_PHRASE_HINTS)))
+_INBOUND_DESTINATION = re.compile("|".join(map(re.escape, _INBOUND_DESTINATION_HINTS)))
+# Existing journal lines that already carry a fee ("transaction fee", "bank fee", ...).
+_FEE_LINE = re.compile(r"fee|کارمزد")
+# Substring hints; each alternation matches wherever any listed phrase would.
+_GROSS_HINT = re.compile(r"gross|including fee|total deducted|statement amount|amount deducted")
+_ACCOUNT_HINT = re.compile(r"account|iban|شماره|حساب|card|کارت")
+_FEE_CONFIG_HINT = re.compile(r"fee|کارمزد|%|toman|rial|max|cap|free")
+_FREE_FEE_HINT = re.compile(r"free|no fee|zero fee")
+_FEE_WORD = re.compile(r"\b(?:fee|transaction fee|کارمزد)\b")
+_PERCENT = re.compile(r"(\d+(?:\.\d+)?)\s*%")
+_MONEY = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*([kmb])?\s*(tomans?|rials?)?")
+_FEE_QUESTION = re.compile(r"transaction fee for (.+?) via (.+?)\?", re.IGNORECASE)
+
+
+# Statements for the per-message lookups, built once; SQLAlchemy caches their
+# compiled SQL and only the bound values change between calls.
+_METHOD_BY_NAME = select(PaymentMethod).where(
+    (PaymentMethod.key == bindparam("key")) | (PaymentMethod.name.ilike(bindparam("name")))
+)
+_BANK_BY_NAME = select(Entity).where(Entity.type == "bank", Entity.name.ilike(bindparam("name")))
+_ACTIVE_FEE_RULE = (
+    select(TransactionFee)
+    .where(
+        TransactionFee.method_id == bindparam("method_id"),
+        TransactionFee.bank_id == bindparam("bank_id"),
+        TransactionFee.is_active.is_(True),
+        TransactionFee.effective_from <= bindparam("as_of"),
+    )
+    .order_by(TransactionFee.effective_from.desc(), TransactionFee.created_at.desc())
+    .limit(1)
+)
+
+
 @dataclass
 class FeeComputation:
     amount_mode: str
@@ -117,65 +195,133 @@ class PaymentContext:
     bank_name: str | None
 
 
+# The normalizers below are pure and see the same method names, bank names and
+# chat messages over and over within a request, so they are memoized.
+@lru_cache(maxsize=256)
 def _normalize_whitespace(text: str) -> str:
-    return re.sub(r"\s+", " ", (text or "")).strip()
+    # str.split() splits on the same Unicode whitespace as \s, without the
+    # regex engine.
+    return " ".join((text or "").split())
 
 
+@lru_cache(maxsize=256)
 def _normalize_text_for_match(text: str) -> str:
     """
     Normalize English/Persian user text for robust intent/keyword matching.
     """
-    t = (text or "").strip().lower()
-    # Normalize Arabic forms often seen on Persian keyboards.
-    t = t.replace("ي", "ی").replace("ك", "ک")
-    # Normalize half-space and punctuation variants.
-    t = t.replace("\u200c", " ").replace("‌", " ")
-    t = t.replace("-", " ")
-    return _normalize_whitespace(t)
+    return _normalize_whitespace((text or "").lower().translate(_MATCH_TABLE))
 
 
+@lru_cache(maxsize=256)
 def _method_key(name: str) -> str:
     raw = (name or "").strip().lower()
     raw = raw.replace("&", " and ")
-    raw = re.sub(r"[^a-z0-9]+", "_", raw)
-    raw = re.sub(r"_+", "_", raw).strip("_")
+    raw = _NON_KEY_CHARS.sub("_", raw).strip("_")
     return raw or "method"
 
 
+# Normalized canonical name and aliases per method, in PAYMENT_METHOD_ALIASES
+# order (the first method with a hit wins), built once at import.
+_METHOD_MATCH_FORMS: tuple[tuple[str, tuple[str, ...]], ...] = tuple(
+    (canonical, tuple(_normalize_text_for_match(form) for form in (canonical, *aliases)))
+    for canonical, aliases in PAYMENT_METHOD_ALIASES.items()
+)
+# Reversed so that, as in the scan, the first method listing a form wins.
+_CANONICAL_BY_FORM: dict[str, str] = {
+    form: canonical for canonical, forms in reversed(_METHOD_MATCH_FORMS) for form in forms
+}
+
+
+@lru_cache(maxsize=256)
 def canonical_method_name(name: str) -> str:
     n = _normalize_whitespace(name)
     if not n:
         return "Payment Method"
     lower = _normalize_text_for_match(n)
-    for canonical, aliases in PAYMENT_METHOD_ALIASES.items():
-        canonical_norm = _normalize_text_for_match(canonical)
-        alias_norms = {_normalize_text_for_match(a) for a in aliases}
-        if lower == canonical_norm or lower in alias_norms:
-            return canonical
+    canonical = _CANONICAL_BY_FORM.get(lower)
+    if canonical:
+        return canonical
     if lower == "card":
         return "Card-to-Card"
     return " ".join(p[:1].upper() + p[1:].lower() for p in n.split(" "))
 
 
 def ensure_default_payment_methods(db: Session) -> int:
-    created = 0
-    for key, name in DEFAULT_PAYMENT_METHODS:
-        existing = db.execute(select(PaymentMethod).where(PaymentMethod.key == key)).scalars().first()
-        if existing:
-            continue
-        db.add(PaymentMethod(key=key, name=name, is_active=True))
-        created += 1
-    if created:
+    keys = [key for key, _ in DEFAULT_PAYMENT_METHODS]
+    existing = set(db.execute(select(PaymentMethod.key).where(PaymentMethod.key.in_(keys))).scalars())
+    missing = [
+        PaymentMethod(key=key, name=name, is_active=True)
+        for key, name in DEFAULT_PAYMENT_METHODS
+        if key not in existing
+    ]
+    if missing:
+        db.add_all(missing)
         db.commit()
-    return created
+    return len(missing)
+
+
+def _lookup_memo(db: Session) -> dict[tuple, Any]:
+    return db.info.setdefault("fee_lookup_rows", {})
+
+
+def _remembered_lookup(db: Session, memo_key: tuple, stmt, params: dict[str, Any], still_matches) -> Any:
+    """Run a by-name lookup once per session and company.
+
+    Chat turns resolve the same method and bank several times; later calls
+    reuse the matched row while it is still loaded in the session. A row that
+    was expired by a commit, deleted or renamed in the meantime falls back to
+    the query. Misses are not remembered, since the row may be created later
+    in the session."""
+    key = (get_current_company(), *memo_key)
+    row = _lookup_memo(db).get(key)
+    if row is not None:
+        state = inspect(row)
+        if state.persistent and not state.expired and row not in db.deleted and still_matches(row):
+            return row
+    row = db.execute(stmt, params).scalars().first()
+    if row is not None:
+        _lookup_memo(db)[key] = row
+    return row
+
+
+def _remember(db: Session, memo_key: tuple, row: Any) -> None:
+    _lookup_memo(db)[(get_current_company(), *memo_key)] = row
+
+
+def _method_memo_key(name: str, key: str) -> tuple:
+    return ("method", key, name.lower())
+
+
+def _bank_memo_key(name: str) -> tuple:
+    return ("bank", name.lower())
+
+
+def _lookup_payment_method(db: Session, name: str, key: str) -> PaymentMethod | None:
+    lowered = name.lower()
+    return _remembered_lookup(
+        db,
+        _method_memo_key(name, key),
+        _METHOD_BY_NAME,
+        {"key": key, "name": name},
+        lambda row: row.key == key or (row.name or "").lower() == lowered,
+    )
+
+
+def _lookup_bank_entity(db: Session, name: str) -> Entity | None:
+    lowered = name.lower()
+    return _remembered_lookup(
+        db,
+        _bank_memo_key(name),
+        _BANK_BY_NAME,
+        {"name": name},
+        lambda row: row.type == "bank" and (row.name or "").lower() == lowered,
+    )
 
 
 def get_or_create_payment_method(db: Session, method_name: str) -> PaymentMethod:
     name = canonical_method_name(method_name)
     key = _method_key(name)
-    existing = db.execute(
-        select(PaymentMethod).where((PaymentMethod.key == key) | (PaymentMethod.name.ilike(name)))
-    ).scalars().first()
+    existing = _lookup_payment_method(db, name, key)
     if existing:
         if not existing.is_active:
             existing.is_active = True
@@ -188,27 +334,24 @@ def get_or_create_payment_method(db: Session, method_name: str) -> PaymentMethod
     row = PaymentMethod(key=key, name=name, is_active=True)
     db.add(row)
     db.flush()
+    _remember(db, _method_memo_key(name, key), row)
     return row
 
 
 def find_payment_method(db: Session, method_name: str) -> PaymentMethod | None:
     name = canonical_method_name(method_name)
-    key = _method_key(name)
-    return db.execute(
-        select(PaymentMethod).where((PaymentMethod.key == key) | (PaymentMethod.name.ilike(name)))
-    ).scalars().first()
+    return _lookup_payment_method(db, name, _method_key(name))
 
 
 def get_or_create_bank_entity(db: Session, bank_name: str) -> Entity:
     name = _normalize_whitespace(bank_name)
-    existing = db.execute(
-        select(Entity).where(Entity.type == "bank", Entity.name.ilike(name))
-    ).scalars().first()
+    existing = _lookup_bank_entity(db, name)
     if existing:
         return existing
     row = Entity(type="bank", name=name)
     db.add(row)
     db.flush()
+    _remember(db, _bank_memo_key(name), row)
     return row
 
 
@@ -216,9 +359,7 @@ def find_bank_entity_by_name(db: Session, bank_name: str) -> Entity | None:
     name = _normalize_whitespace(bank_name)
     if not name:
         return None
-    return db.execute(
-        select(Entity).where(Entity.type == "bank", Entity.name.ilike(name))
-    ).scalars().first()
+    return _lookup_bank_entity(db, name)
 
 
 def _effective_fee_values(rule: TransactionFee) -> tuple[int, int]:
@@ -262,39 +403,41 @@ def fee_amount_for_base(base_amount: int, rule: TransactionFee) -> tuple[int, bo
     return max(0, int(fee)), cap_applied
 
 
-def _gross_for_base(base: int, rule: TransactionFee) -> int:
-    fee, _ = fee_amount_for_base(base, rule)
-    return base + fee
-
-
 def _solve_base_from_gross(gross_amount: int, rule: TransactionFee) -> int:
     gross = max(0, int(gross_amount or 0))
     if gross == 0 or rule.fee_type == FeeType.FREE:
         return gross
-    lo, hi = 0, gross
-    best = 0
-    while lo <= hi:
-        mid = (lo + hi) // 2
-        total = _gross_for_base(mid, rule)
-        if total == gross:
-            return mid
-        if total < gross:
-            best = mid
-            lo = mid + 1
-        else:
-            hi = mid - 1
-    start = max(0, best - 10_000)
-    end = min(gross, best + 10_000)
-    nearest = best
-    nearest_delta = abs(_gross_for_base(best, rule) - gross)
-    for base in range(start, end + 1):
-        delta = abs(_gross_for_base(base, rule) - gross)
-        if delta < nearest_delta:
-            nearest = base
-            nearest_delta = delta
-            if delta == 0:
-                return base
-    return nearest
+    # base + fee(base) is strictly increasing in base, so the answer is the
+    # largest base that does not overshoot ``gross`` (or the next one, if that
+    # lands closer). Uncapped, fee = flat + base * bps / 10000; capped,
+    # fee = max_fee. Invert whichever regime allows the larger base, then step
+    # off the rounding slack.
+    flat_fee, percent_bps = _effective_fee_values(rule)
+    cap = None if rule.max_fee is None else max(0, int(rule.max_fee))
+    ratio = percent_bps / 10_000
+
+    # fee_amount_for_base with the rule already unpacked: for every fee type
+    # but FREE the fee is flat + the rounded percentage (one of them being 0
+    # for FLAT and PERCENT), then capped.
+    def gross_for(base: int) -> int:
+        fee = flat_fee + int(round(base * ratio))
+        if cap is not None and fee > cap:
+            fee = cap
+        return base + fee
+
+    base = (gross - flat_fee) * 10_000 // (10_000 + percent_bps)
+    if cap is not None:
+        base = max(base, gross - cap)
+    base = min(max(base, 0), gross)
+    while base > 0 and gross_for(base) > gross:
+        base -= 1
+    while base < gross and gross_for(base + 1) <= gross:
+        base += 1
+    below = gross_for(base)
+    if below >= gross:
+        return base
+    above = gross_for(base + 1)
+    return base + 1 if above - gross < gross - below else base
 
 
 def calculate_total_with_fee(amount: int, rule: TransactionFee, amount_mode: str = "net") -> FeeComputation:
@@ -376,18 +519,8 @@ def get_active_fee_rule(
     bank_id: uuid.UUID,
     as_of: date | None = None,
 ) -> TransactionFee | None:
-    target_date = as_of or date.today()
-    q = (
-        select(TransactionFee)
-        .where(
-            TransactionFee.method_id == method_id,
-            TransactionFee.bank_id == bank_id,
-            TransactionFee.is_active.is_(True),
-            TransactionFee.effective_from <= target_date,
-        )
-        .order_by(TransactionFee.effective_from.desc(), TransactionFee.created_at.desc())
-    )
-    return db.execute(q).scalars().first()
+    params = {"method_id": method_id, "bank_id": bank_id, "as_of": as_of or date.today()}
+    return db.execute(_ACTIVE_FEE_RULE, params).scalars().first()
 
 
 def resolve_fee_rule(
@@ -424,13 +557,17 @@ def build_fee_line_items(fee_amount: int, method_name: str, bank_name: str) -> l
     ]
 
 
+def _user_texts(messages: list[dict[str, str]]) -> list[str]:
+    return [(m.get("content") or "") for m in messages if m.get("role") == "user"]
+
+
 def infer_amount_mode(messages: list[dict[str, str]]) -> str:
-    text = " ".join([(m.get("content") or "") for m in messages if m.get("role") == "user"]).lower()
-    if any(k in text for k in ("gross", "including fee", "total deducted", "statement amount", "amount deducted")):
-        return "gross"
-    if any(k in text for k in ("net", "excluding fee", "without fee", "after fee")):
-        return "net"
-    return "net"
+    return _amount_mode_from_text(" ".join(_user_texts(messages)))
+
+
+def _amount_mode_from_text(user_text: str) -> str:
+    # Anything that is not explicitly gross is net.
+    return "gross" if _GROSS_HINT.search(user_text.lower()) else "net"
 
 
 def _parse_number_token(token: str) -> float:
@@ -458,74 +595,55 @@ def _money_from_token(token: str, suffix: str | None = None, currency: str | Non
     return max(0, val)
 
 
+# The chat history is sent again on every turn, so extract_payment_context
+# re-reads the same earlier messages; the per-message extractors are pure and
+# memoized.
+@lru_cache(maxsize=256)
 def parse_amount_int(text: str) -> int:
     if not text:
         return 0
     t = text.lower()
-    t = re.sub(
-        r"(?:account|acc(?:ount)?|iban|card|شماره\s*حساب|شماره\s*کارت)\s*[:#-]?\s*\d[\d,]{5,}",
-        " ",
-        t,
-    )
-    m = re.search(r"(\d[\d,]*(?:\.\d+)?)\s*([kmb])\b", t)
+    # Every amount form below starts with a digit; most chat turns have none.
+    if not _DIGIT.search(t):
+        return 0
+    t = _ACCOUNT_NUMBER.sub(" ", t)
+    m = _AMOUNT_KMB.search(t)
     if m:
         return _money_from_token(m.group(1), m.group(2), None)
-    m = re.search(r"(\d[\d,]*(?:\.\d+)?)\s*(million|billion)\b", t)
+    m = _AMOUNT_WORD.search(t)
     if m:
         sf = "m" if m.group(2).lower().startswith("m") else "b"
         return _money_from_token(m.group(1), sf, None)
-    m = re.search(r"(\d[\d,]*(?:\.\d+)?)\s*(tomans?|rials?)\b", t)
+    m = _AMOUNT_CURRENCY.search(t)
     if m:
         return _money_from_token(m.group(1), None, m.group(2))
     # Currency code/word may come immediately after amount (e.g. "79471400IRR")
-    m = re.search(r"(?<!\d)(\d[\d,]*(?:\.\d+)?)(?:\s*(?:irr|rial|rials|ریال|ريال|تومان|tomans?))(?!\d)", t, re.IGNORECASE)
+    m = _AMOUNT_TRAILING_CURRENCY.search(t)
     if m:
         return _money_from_token(m.group(1), None, None)
-    m = re.search(r"(?<!\d)(\d[\d,]{2,})(?!\d)", t)
+    m = _BARE_NUMBER.search(t)
     if m:
         return _money_from_token(m.group(1), None, None)
     return 0
 
 
 def is_payment_intent(messages: list[dict[str, str]]) -> bool:
-    text = _normalize_text_for_match(" ".join([(m.get("content") or "") for m in messages if m.get("role") == "user"]))
+    return _is_payment_text(" ".join(_user_texts(messages)))
+
+
+def _is_payment_text(user_text: str) -> bool:
+    text = _normalize_text_for_match(user_text)
     # Treat explicit "paid us / to us" style phrases as receipt (money in), not payment-out.
-    receipt_phrase_hints = (
-        "paid us",
-        "pay us",
-        "to us",
-        "received from",
-        "got paid",
-        "be ma",
-        "به ما",
-        "به حساب ما",
-        "واریز کرد",
-        "دریافت کردیم",
-    )
-    if any(h in text for h in receipt_phrase_hints):
+    if _RECEIPT_PHRASE.search(text):
         return False
     # Treat third-party "X paid to [our bank/account]" as receipt.
     # Example: "Nikzade payed to Mellat bank ..." should be money-in.
-    m_paid_to = re.search(
-        r"\b([a-z\u0600-\u06ff][a-z0-9\u0600-\u06ff]*)\s+(?:paid|payed)\s+to\s+(.+)$",
-        text,
-    )
+    m_paid_to = _PAID_TO.search(text)
     if m_paid_to:
         subject = (m_paid_to.group(1) or "").strip()
         destination = (m_paid_to.group(2) or "").strip()
         is_first_person_subject = subject in {"i", "we", "من", "ما"}
-        destination_looks_inbound = any(
-            k in destination
-            for k in (
-                " to us",
-                " us ",
-                "our account",
-                "my account",
-                "bank",
-                "بانک",
-                "حساب",
-            )
-        )
+        destination_looks_inbound = _INBOUND_DESTINATION.search(destination) is not None
         if (not is_first_person_subject) and destination_looks_inbound:
             return False
     pay_hits = sum(1 for k in _PAYMENT_KEYWORDS if k in text)
@@ -533,26 +651,23 @@ def is_payment_intent(messages: list[dict[str, str]]) -> bool:
     return pay_hits > 0 and pay_hits >= recv_hits
 
 
+@lru_cache(maxsize=256)
 def extract_payment_method(text: str) -> str | None:
     raw = (text or "").strip()
     if not raw:
         return None
     lower = _normalize_text_for_match(raw)
-    for canonical, aliases in PAYMENT_METHOD_ALIASES.items():
-        canonical_norm = _normalize_text_for_match(canonical)
-        alias_norms = [_normalize_text_for_match(a) for a in aliases]
-        if canonical_norm in lower:
+    for canonical, forms in _METHOD_MATCH_FORMS:
+        if any(form in lower for form in forms):
             return canonical
-        if any(a in lower for a in alias_norms):
-            return canonical
-    m = re.search(r"\b(?:via|with|through|using|با)\s+([a-z\u0600-\u06ff][a-z0-9\u0600-\u06ff\-\s]{2,60})\b", lower)
+    m = _VIA_METHOD.search(lower)
     if m:
         frag = _normalize_whitespace(m.group(1))
-        if re.search(r"\d{4,}", frag):
+        if _LONG_NUMBER.search(frag):
             return None
-        if any(k in frag for k in ("account", "iban", "شماره", "حساب", "card", "کارت")):
+        if _ACCOUNT_HINT.search(frag):
             return None
-        if re.search(r"\b(?:mellat|melli|tejarat|saderat|saman|parsian|pasargad)\b", frag):
+        if _BANK_WORD.search(frag):
             return None
         if "bank" in frag and "online banking" not in frag and "internet banking" not in frag:
             return None
@@ -560,15 +675,33 @@ def extract_payment_method(text: str) -> str | None:
     return None
 
 
+@lru_cache(maxsize=32)
+def _known_bank_matcher(known_banks: tuple[str, ...]) -> tuple[re.Pattern[str], dict[str, tuple[int, str]]] | None:
+    """One pattern for a bank list, plus each lowercased name's rank and
+    original spelling. Names are ranked longest first and matched inside a
+    lookahead, so ``finditer`` tries every start position rather than only
+    non-overlapping ones."""
+    ranked: dict[str, tuple[int, str]] = {}
+    for name in sorted((b for b in known_banks if b), key=len, reverse=True):
+        ranked.setdefault(name.lower(), (len(ranked), name))
+    if not ranked:
+        return None
+    alternation = "|".join(re.escape(name) for name in ranked)
+    return re.compile(rf"(?=\b({alternation})\b)"), ranked
+
+
 def extract_bank_name(text: str, known_banks: list[str]) -> str | None:
     if not text:
         return None
-    normalized_known = [b for b in known_banks if b]
     lower = text.lower()
-    for name in sorted(normalized_known, key=len, reverse=True):
-        if re.search(r"\b" + re.escape(name.lower()) + r"\b", lower):
-            return name
-    m = re.search(r"\b(?:from|via|through|to)\s+([a-z][a-z0-9\s]{1,40})\s+bank\b", lower)
+    matcher = _known_bank_matcher(tuple(known_banks))
+    if matcher is not None:
+        pattern, ranked = matcher
+        # The longest known name wins wherever it appears, not the leftmost one.
+        best = min((ranked[m.group(1)] for m in pattern.finditer(lower)), default=None)
+        if best is not None:
+            return best[1]
+    m = _VIA_BANK.search(lower)
     if m:
         return canonical_method_name(m.group(1))
     return None
@@ -578,8 +711,10 @@ def extract_payment_context(
     messages: list[dict[str, str]],
     known_banks: list[str],
 ) -> PaymentContext:
-    user_texts = [(m.get("content") or "") for m in messages if m.get("role") == "user"]
-    is_payment = is_payment_intent(messages)
+    user_texts = _user_texts(messages)
+    # Joined once for both whole-conversation checks.
+    user_text = " ".join(user_texts)
+    is_payment = _is_payment_text(user_text)
     amount = 0
     method_name = None
     bank_name = None
@@ -595,7 +730,7 @@ def extract_payment_context(
     return PaymentContext(
         is_payment=is_payment,
         amount=amount,
-        amount_mode=infer_amount_mode(messages),
+        amount_mode=_amount_mode_from_text(user_text),
         method_name=method_name,
         bank_name=bank_name,
     )
@@ -603,10 +738,7 @@ def extract_payment_context(
 
 def _find_cap(text: str) -> int | None:
     t = text.lower()
-    m = re.search(
-        r"(?:max(?:imum)?|up\s*to|cap(?:ped)?(?:\s*at)?)\s*(?:of|at)?\s*(\d[\d,]*(?:\.\d+)?)\s*([kmb])?\s*(tomans?|rials?)?",
-        t,
-    )
+    m = _FEE_CAP.search(t)
     if not m:
         return None
     val = _money_from_token(m.group(1), m.group(2), m.group(3))
@@ -619,16 +751,16 @@ def parse_fee_config_text(text: str) -> dict[str, Any] | None:
     t = text.strip().lower()
     if not t:
         return None
-    has_fee_keyword = any(k in t for k in ("fee", "transaction fee", "کارمزد", "%", "toman", "rial", "max", "cap", "free"))
+    has_fee_keyword = _FEE_CONFIG_HINT.search(t) is not None
     from_bare_number = False
-    if not has_fee_keyword and not re.fullmatch(r"\s*0+(?:\.0+)?\s*(?:tomans?|rials?)?\s*", t):
+    if not has_fee_keyword and not _ZERO_AMOUNT.fullmatch(t):
         # Allow bare numeric replies like "5000" as fee answers, but reject long free-form sentences
         # that likely describe a new transaction.
-        if re.fullmatch(r"\s*\d[\d,]*(?:\.\d+)?\s*(?:tomans?|rials?)?\s*", t):
+        if _BARE_AMOUNT.fullmatch(t):
             from_bare_number = True
         else:
             return None
-    if any(k in t for k in ("fee-free", "fee free", "no fee", "zero fee", "free")):
+    if _FREE_FEE_HINT.search(t):
         return {
             "fee_type": "free",
             "fee_value": 0,
@@ -640,9 +772,9 @@ def parse_fee_config_text(text: str) -> dict[str, Any] | None:
     # Accept explicit zero-fee statements such as:
     # "0", "fee is 0", "transaction fee was 0 for this payment", "0 toman".
     # Guardrail: do not treat decimals like 0.01% as zero fee.
-    explicit_zero_token = bool(re.search(r"(?<![\d.])0+(?:\.0+)?(?![\d.])", t))
-    has_non_zero_decimal = bool(re.search(r"\d*\.\d*[1-9]\d*", t))
-    if re.search(r"\b(?:fee|transaction fee|کارمزد)\b", t) and explicit_zero_token and not has_non_zero_decimal:
+    explicit_zero_token = bool(_ZERO_TOKEN.search(t))
+    has_non_zero_decimal = bool(_NON_ZERO_DECIMAL.search(t))
+    if _FEE_WORD.search(t) and explicit_zero_token and not has_non_zero_decimal:
         return {
             "fee_type": "free",
             "fee_value": 0,
@@ -651,7 +783,7 @@ def parse_fee_config_text(text: str) -> dict[str, Any] | None:
             "max_fee": None,
             "from_bare_number": False,
         }
-    if re.fullmatch(r"\s*0+(?:\.0+)?\s*(?:tomans?|rials?)?\s*", t):
+    if _ZERO_AMOUNT.fullmatch(t):
         return {
             "fee_type": "free",
             "fee_value": 0,
@@ -662,18 +794,14 @@ def parse_fee_config_text(text: str) -> dict[str, Any] | None:
         }
 
     percent_bps = 0
-    m_percent = re.search(r"(\d+(?:\.\d+)?)\s*%", t)
+    m_percent = _PERCENT.search(t)
     if m_percent:
         percent_bps = max(0, int(round(float(m_percent.group(1)) * 100)))
     max_fee = _find_cap(t)
 
-    sanitized = re.sub(r"\d+(?:\.\d+)?\s*%", " ", t)
-    sanitized = re.sub(
-        r"(?:max(?:imum)?|up\s*to|cap(?:ped)?(?:\s*at)?)\s*(?:of|at)?\s*\d[\d,]*(?:\.\d+)?\s*[kmb]?\s*(?:tomans?|rials?)?",
-        " ",
-        sanitized,
-    )
-    money_matches = re.findall(r"(\d[\d,]*(?:\.\d+)?)\s*([kmb])?\s*(tomans?|rials?)?", sanitized)
+    sanitized = _PERCENT.sub(" ", t)
+    sanitized = _FEE_CAP.sub(" ", sanitized)
+    money_matches = _MONEY.findall(sanitized)
     flat_fee = 0
     for tok, suffix, currency in money_matches:
         value = _money_from_token(tok, suffix, currency)
@@ -703,7 +831,7 @@ def parse_fee_config_text(text: str) -> dict[str, Any] | None:
 
 def parse_fee_question_context(last_assistant_message: str) -> tuple[str, str] | None:
     text = _normalize_whitespace(last_assistant_message)
-    m = re.search(r"transaction fee for (.+?) via (.+?)\?", text, re.IGNORECASE)
+    m = _FEE_QUESTION.search(text)
     if not m:
         return None
     method = canonical_method_name(m.group(1))
@@ -763,39 +891,49 @@ def recalculate_current_month_pending_entries(
     target_rule = get_active_fee_rule(db, method_id, bank_id, as_of=as_of)
     if not target_rule:
         return 0
-    today = date.today()
-    month_start = today.replace(day=1)
+    month_start = date.today().replace(day=1)
+    # Applications are anchored on their transaction's date, or on when they
+    # were recorded if the transaction is gone.
     q = (
         select(TransactionFeeApplication)
-        .options(selectinload(TransactionFeeApplication.transaction))
+        .outerjoin(Transaction, TransactionFeeApplication.transaction_id == Transaction.id)
         .where(
             TransactionFeeApplication.method_id == method_id,
             TransactionFeeApplication.bank_id == bank_id,
             TransactionFeeApplication.status == FeeApplicationStatus.PENDING,
+            or_(
+                Transaction.date >= month_start,
+                and_(
+                    Transaction.id.is_(None),
+                    or_(
+                        TransactionFeeApplication.created_at.is_(None),
+                        TransactionFeeApplication.created_at >= datetime.combine(month_start, time.min),
+                    ),
+                ),
+            ),
         )
+        .execution_options(yield_per=100)
+    )
+    note = (
+        f"Recalculated on {datetime.utcnow().date().isoformat()} from updated fee rule "
+        f"({target_rule.fee_type.value})."
     )
-    apps = db.execute(q).scalars().all()
     updated = 0
-    for app in apps:
-        tx: Transaction | None = getattr(app, "transaction", None)
-        anchor_date = tx.date if tx is not None else (app.created_at.date() if app.created_at else today)
-        if anchor_date < month_start:
-            continue
-        mode = (app.amount_mode or "net").lower()
-        source_amount = app.gross_amount if mode == "gross" else (app.net_amount or app.base_amount or app.gross_amount)
-        if not source_amount:
-            continue
-        calc = calculate_total_with_fee(int(source_amount), target_rule, amount_mode=mode)
-        app.fee_rule_id = target_rule.id
-        app.base_amount = calc.base_amount
-        app.fee_amount = calc.fee_amount
-        app.gross_amount = calc.gross_amount
-        app.net_amount = calc.net_amount
-        app.note = (
-            f"Recalculated on {datetime.utcnow().date().isoformat()} from updated fee rule "
-            f"({target_rule.fee_type.value})."
-        )
-        updated += 1
+    for batch in db.execute(q).scalars().partitions():
+        for app in batch:
+            mode = (app.amount_mode or "net").lower()
+            source_amount = app.gross_amount if mode == "gross" else (app.net_amount or app.base_amount or app.gross_amount)
+            if not source_amount:
+                continue
+            calc = calculate_total_with_fee(int(source_amount), target_rule, amount_mode=mode)
+            app.fee_rule_id = target_rule.id
+            app.base_amount = calc.base_amount
+            app.fee_amount = calc.fee_amount
+            app.gross_amount = calc.gross_amount
+            app.net_amount = calc.net_amount
+            app.note = note
+            updated += 1
+        db.flush()
     return updated
 
 
@@ -810,27 +948,44 @@ def apply_fee_to_transaction_lines(
     lines = transaction.get("lines")
     if not isinstance(lines, list) or not lines:
         return transaction, None
+    # The bank credit leg is found first, so a transaction without one is left
+    # alone even if its other lines are malformed; the remaining legs are then
+    # classified in a single pass.
     bank_idx = -1
     bank_credit = 0
+    legs: list[tuple[int, str, dict[str, Any]]] = []
     for i, line in enumerate(lines):
-        if str(line.get("account_code") or "").strip() == BANK_ACCOUNT_CODE and int(line.get("credit") or 0) > bank_credit:
+        code = str(line.get("account_code") or "").strip()
+        if code != BANK_ACCOUNT_CODE:
+            legs.append((i, code, line))
+            continue
+        credit = int(line.get("credit") or 0)
+        if credit > bank_credit:
             bank_idx = i
-            bank_credit = int(line.get("credit") or 0)
+            bank_credit = credit
     if bank_idx < 0 or bank_credit <= 0:
         return transaction, None
 
-    debit_candidate_indices = [
-        i for i, line in enumerate(lines)
-        if str(line.get("account_code") or "").strip() != BANK_ACCOUNT_CODE and int(line.get("debit") or 0) > 0
-    ]
+    debit_candidate_indices: list[int] = []
+    fee_candidate_indices: list[int] = []
+    non_fee_debit_indices: list[int] = []
+    base_from_lines = 0
+    non_fee_debit = 0
+    for i, code, line in legs:
+        debit = int(line.get("debit") or 0)
+        is_fee_code = code == FEE_EXPENSE_ACCOUNT_CODE
+        is_fee_line = is_fee_code or _FEE_LINE.search(str(line.get("line_description") or "").lower()) is not None
+        if is_fee_line:
+            fee_candidate_indices.append(i)
+        if debit > 0:
+            debit_candidate_indices.append(i)
+            if not is_fee_code:
+                base_from_lines += debit
+            if not is_fee_line:
+                non_fee_debit_indices.append(i)
+                non_fee_debit += debit
     if not debit_candidate_indices:
         return transaction, None
-
-    base_from_lines = sum(
-        int(lines[i].get("debit") or 0)
-        for i in debit_candidate_indices
-        if str(lines[i].get("account_code") or "").strip() != FEE_EXPENSE_ACCOUNT_CODE
-    )
     if base_from_lines <= 0:
         base_from_lines = bank_credit
 
@@ -844,15 +999,6 @@ def apply_fee_to_transaction_lines(
         return transaction, calc
 
     fee_note = f"Transaction fee - {canonical_method_name(method_name)} via {_normalize_whitespace(bank_name)}"
-    fee_keywords = ("fee", "transaction fee", "bank fee", "کارمزد")
-    fee_candidate_indices: list[int] = []
-    for i, l in enumerate(lines):
-        code = str(l.get("account_code") or "").strip()
-        if code == BANK_ACCOUNT_CODE:
-            continue
-        desc = str(l.get("line_description") or "").strip().lower()
-        if code == FEE_EXPENSE_ACCOUNT_CODE or any(k in desc for k in fee_keywords):
-            fee_candidate_indices.append(i)
     # If AI already inserted a fee line (possibly on wrong account), normalize to 6210
     # and avoid doubling fee.
     for idx in fee_candidate_indices:
@@ -879,22 +1025,12 @@ def apply_fee_to_transaction_lines(
 
     bank_line = lines[bank_idx]
     if mode == "gross":
-        non_fee_debit_indices = [
-            i for i in debit_candidate_indices
-            if str(lines[i].get("account_code") or "").strip() != FEE_EXPENSE_ACCOUNT_CODE
-        ]
         if non_fee_debit_indices:
-            current_base = sum(int(lines[i].get("debit") or 0) for i in non_fee_debit_indices)
-            delta = current_base - calc.base_amount
+            delta = non_fee_debit - calc.base_amount
             if delta != 0:
                 target_idx = max(non_fee_debit_indices, key=lambda ix: int(lines[ix].get("debit") or 0))
                 lines[target_idx]["debit"] = max(0, int(lines[target_idx].get("debit") or 0) - delta)
     else:
-        non_fee_debit = sum(
-            max(0, int(l.get("debit") or 0))
-            for l in lines
-            if str(l.get("account_code") or "").strip() not in (BANK_ACCOUNT_CODE, FEE_EXPENSE_ACCOUNT_CODE)
-        )
         bank_line["credit"] = non_fee_debit + fee
 
     bank_desc = (bank_line.get("line_description") or "Payment from bank").strip()
@@ -903,8 +1039,11 @@ def apply_fee_to_transaction_lines(
     else:
         bank_line["line_description"] = bank_desc
 
-    total_debit = sum(max(0, int(l.get("debit") or 0)) for l in lines)
-    total_credit = sum(max(0, int(l.get("credit") or 0)) for l in lines)
+    total_debit = 0
+    total_credit = 0
+    for l in lines:
+        total_debit += max(0, int(l.get("debit") or 0))
+        total_credit += max(0, int(l.get("credit") or 0))
     if total_debit != total_credit:
         diff = total_debit - total_credit
         if diff > 0:
@@ -12,47 +12,158 @@ All conversions return standard datetime.date (Gregorian).
 from __future__ import annotations
 
 import re
+from bisect import bisect_right
 from datetime import date
+from functools import lru_cache
 
 import jdatetime
 
-_PERSIAN_DIGITS = str.maketrans("۰۱۲۳۴۵۶۷۸۹", "0123456789")
+# Persian and Arabic-Indic digits to ASCII, and Arabic yeh/kaf to their
+# Persian forms so month names need one spelling each.
+_FOLD = str.maketrans("۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩يىك", "01234567890123456789ییک")
 
 _MONTH_NAMES: dict[str, int] = {
-    "فروردین": 1, "farvardin": 1, "فروردين": 1,
-    "اردیبهشت": 2, "ordibehesht": 2, "ارديبهشت": 2,
+    "فروردین": 1, "farvardin": 1,
+    "اردیبهشت": 2, "ordibehesht": 2,
     "خرداد": 3, "khordad": 3,
-    "تیر": 4, "tir": 4, "تير": 4,
+    "تیر": 4, "tir": 4,
     "مرداد": 5, "mordad": 5, "amordad": 5,
-    "شهریور": 6, "shahrivar": 6, "شهريور": 6,
+    "شهریور": 6, "shahrivar": 6,
     "مهر": 7, "mehr": 7,
     "آبان": 8, "aban": 8,
     "آذر": 9, "azar": 9,
-    "دی": 10, "dey": 10, "دي": 10,
+    "دی": 10, "dey": 10,
     "بهمن": 11, "bahman": 11,
     "اسفند": 12, "esfand": 12, "espand": 12,
 }
 
-_JALALI_YEAR_RANGE = range(1300, 1500)
+_JALALI_YEAR_MIN, _JALALI_YEAR_MAX = 1300, 1500
+
+# Every date pattern below needs at least one digit.
+_DIGIT = re.compile(r"\d")
+
+_JALALI_YMD = re.compile(r"\b(1[34]\d{2})[/\-](0?[1-9]|1[0-2])[/\-](0?[1-9]|[12]\d|3[01])\b")
+_JALALI_DMY = re.compile(r"\b(0?[1-9]|[12]\d|3[01])[/\-](0?[1-9]|1[0-2])[/\-](1[34]\d{2})\b")
+# Every month-name pattern below contains its name, so text this does not
+# match cannot match any of them.
+_ANY_MONTH_NAME = re.compile("|".join(map(re.escape, _MONTH_NAMES)), re.IGNORECASE)
+# The same names, one group each in _MONTH_NAMES order, inside a lookahead so
+# that finditer reports a name at every position it starts (no name is a
+# prefix of another, so at most one matches per position).
+_MONTH_NAME_AT = re.compile(
+    "(?=(?:" + "|".join(f"({re.escape(name)})" for name in _MONTH_NAMES) + "))", re.IGNORECASE
+)
+
+
+def _compile_month_patterns(name: str) -> tuple[re.Pattern, re.Pattern, re.Pattern, re.Pattern]:
+    """``(with_year, day_year, day_month, month_day)`` patterns for one month name."""
+    n = re.escape(name)
+    return (
+        # "27 بهمن 1404" or "بهمن 27 1404" or "بهمن 1404"
+        re.compile(rf"(?:(\d{{1,2}})\s+{n}\s+(\d{{4}}))|(?:{n}\s+(\d{{1,2}})\s+(\d{{4}}))|(?:{n}\s+(\d{{4}}))", re.IGNORECASE),
+        # "27 بهمن 1404" only, for in-place replacement; the year group only
+        # admits 1300-1499, so matches need no range check
+        re.compile(rf"(\d{{1,2}})\s+{n}\s+(1[34]\d{{2}})", re.IGNORECASE),
+        # "4th of Esfand", "4 of Esfand", "4 Esfand", "27 بهمن"
+        re.compile(rf"(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?{n}(?:\s|$|[.,;!?])", re.IGNORECASE),
+        # "Esfand 4", "Esfand 4th", "بهمن 27"
+        re.compile(rf"{n}\s+(\d{{1,2}})(?:st|nd|rd|th)?(?:\s|$|[.,;!?])", re.IGNORECASE),
+    )
+
+
+# Compiled once here rather than rebuilt for every month on every call.
+_MONTH_PATTERNS: list[tuple[int, tuple[re.Pattern, re.Pattern, re.Pattern, re.Pattern]]] = [
+    (month_num, _compile_month_patterns(name)) for name, month_num in _MONTH_NAMES.items()
+]
+
+
+def _month_patterns_in(text: str) -> list[tuple[int, tuple[re.Pattern, re.Pattern, re.Pattern, re.Pattern]]]:
+    """The :data:`_MONTH_PATTERNS` entries whose month name occurs in ``text``,
+    in table order, so only those months' patterns are run."""
+    if not _ANY_MONTH_NAME.search(text):
+        return []
+    found = sorted({m.lastindex for m in _MONTH_NAME_AT.finditer(text)})
+    return [_MONTH_PATTERNS[i - 1] for i in found]
 
 
 def _to_ascii(text: str) -> str:
-    return text.translate(_PERSIAN_DIGITS)
+    return text.translate(_FOLD)
 
 
-def jalali_to_gregorian(year: int, month: int, day: int) -> date:
-    """Convert a Jalali date to Gregorian. Raises ValueError on invalid input."""
-    jd = jdatetime.date(year, month, day)
-    gd = jd.togregorian()
-    return date(gd.year, gd.month, gd.day)
+def _exact_ymd(text: str) -> tuple[int, int, int] | None:
+    """``(year, month, day)`` when ``text`` is exactly a zero-padded
+    "1404/11/27" or "1404-11-27", the shape form fields and OCR cells arrive
+    in. Read by slicing, without the regex engine; anything else is None."""
+    if len(text) != 10 or text[4] not in "/-" or text[7] not in "/-":
+        return None
+    digits = text[:4] + text[5:7] + text[8:]
+    if not (digits.isascii() and digits.isdigit()):
+        return None
+    year, month, day = int(text[:4]), int(text[5:7]), int(text[8:])
+    if _JALALI_YEAR_MIN <= year < _JALALI_YEAR_MAX and 1 <= month <= 12 and 1 <= day <= 31:
+        return year, month, day
+    return None
 
 
-def gregorian_to_jalali(d: date) -> tuple[int, int, int]:
-    """Convert a Gregorian date to (jalali_year, jalali_month, jalali_day)."""
-    jd = jdatetime.date.fromgregorian(date=d)
-    return jd.year, jd.month, jd.day
+def _has_date_separator(text: str) -> bool:
+    """Numeric dates need a "/" or "-"; two substring checks are cheaper than
+    letting both numeric patterns scan text that has neither."""
+    return "/" in text or "-" in text
+
 
+# Closed-form Jalali arithmetic, using jdatetime's own rule: a year is leap
+# when year % 33 is one of _LEAP_RESIDUES, so every 33-year cycle has 8 leap
+# years (12053 days). Jalali 1/1/1 is Gregorian 622-03-21.
+_JALALI_EPOCH = date(622, 3, 21).toordinal()
+_JALALI_MIN_YEAR, _JALALI_MAX_YEAR = 1, 9377
+_LEAP_RESIDUES = frozenset((1, 5, 9, 13, 17, 22, 26, 30))
+_CYCLE_DAYS = 33 * 365 + len(_LEAP_RESIDUES)
+# Leap years among cycle years 1..i, and the day each cycle year starts on.
+_LEAPS_THROUGH = tuple(sum(1 for r in _LEAP_RESIDUES if r <= i) for i in range(33))
+_CYCLE_YEAR_START = tuple(365 * i + _LEAPS_THROUGH[min(i, 32)] for i in range(34))
+_MONTH_START = (0, 31, 62, 93, 124, 155, 186, 216, 246, 276, 306, 336)
 
+
+# Reports and statements convert the same few hundred dates (period bounds,
+# row dates) over and over; the conversions are pure, so they are memoized.
+@lru_cache(maxsize=4096)
+def jalali_to_gregorian(year: int, month: int, day: int) -> date:
+    """Convert a Jalali date to Gregorian. Raises ValueError on invalid input."""
+    if not _JALALI_MIN_YEAR <= year <= _JALALI_MAX_YEAR:
+        raise ValueError("year is out of range")
+    if not 1 <= month <= 12:
+        raise ValueError("month must be in 1..12")
+    if not 1 <= day <= (31 if month <= 6 else 30):
+        raise ValueError("day is out of range for month")
+    if month == 12 and day == 30 and year % 33 not in _LEAP_RESIDUES:
+        raise ValueError("day is out of range for month")
+    cycles, cycle_year = divmod(year - 1, 33)
+    return date.fromordinal(
+        _JALALI_EPOCH
+        + cycles * _CYCLE_DAYS
+        + _CYCLE_YEAR_START[cycle_year]
+        + _MONTH_START[month - 1]
+        + day
+        - 1
+    )
+
+
+@lru_cache(maxsize=4096)
+def gregorian_to_jalali(d: date) -> tuple[int, int, int]:
+    """Convert a Gregorian date to (jalali_year, jalali_month, jalali_day)."""
+    cycles, days = divmod(d.toordinal() - _JALALI_EPOCH, _CYCLE_DAYS)
+    cycle_year = bisect_right(_CYCLE_YEAR_START, days) - 1
+    year = cycles * 33 + cycle_year + 1
+    if not _JALALI_MIN_YEAR <= year <= _JALALI_MAX_YEAR:
+        raise ValueError("year is out of range")
+    day_of_year = days - _CYCLE_YEAR_START[cycle_year]
+    if day_of_year < 186:
+        return year, day_of_year // 31 + 1, day_of_year % 31 + 1
+    day_of_year -= 186
+    return year, day_of_year // 30 + 7, day_of_year % 30 + 1
+
+
+@lru_cache(maxsize=4096)
 def format_jalali(d: date) -> str:
     """Format a Gregorian date as Jalali string 'YYYY/MM/DD'."""
     y, m, day = gregorian_to_jalali(d)
@@ -66,36 +177,62 @@ def try_parse_jalali(text: str) -> date | None:
     """
     if not text:
         return None
-    t = _to_ascii(text.strip())
+    return _parse_jalali(text, date.today())
 
-    # 1404/11/27 or 1404-11-27
-    m = re.search(r"\b(1[34]\d{2})[/\-](0?[1-9]|1[0-2])[/\-](0?[1-9]|[12]\d|3[01])\b", t)
-    if m:
-        try:
-            return jalali_to_gregorian(int(m.group(1)), int(m.group(2)), int(m.group(3)))
-        except ValueError:
-            pass
 
-    # 27/11/1404 (day first if year > 31)
-    m = re.search(r"\b(0?[1-9]|[12]\d|3[01])[/\-](0?[1-9]|1[0-2])[/\-](1[34]\d{2})\b", t)
-    if m:
+# Report prompts and templates ask for the same phrases over and over. A date
+# without a year is resolved against today, so today is part of the key.
+@lru_cache(maxsize=1024)
+def _parse_jalali(text: str, today: date) -> date | None:
+    t = _to_ascii(text.strip())
+    ymd = _exact_ymd(t)
+    if ymd is not None:
         try:
-            return jalali_to_gregorian(int(m.group(3)), int(m.group(2)), int(m.group(1)))
+            return jalali_to_gregorian(*ymd)
         except ValueError:
             pass
+    if not _DIGIT.search(t):
+        return None
 
-    today_jalali = jdatetime.date.today()
-    current_jalali_year = today_jalali.year
+    if _has_date_separator(t):
+        # 1404/11/27 or 1404-11-27
+        m = _JALALI_YMD.search(t)
+        if m:
+            try:
+                return jalali_to_gregorian(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+            except ValueError:
+                pass
+
+        # 27/11/1404 (day first if year > 31)
+        m = _JALALI_DMY.search(t)
+        if m:
+            try:
+                return jalali_to_gregorian(int(m.group(3)), int(m.group(2)), int(m.group(1)))
+            except ValueError:
+                pass
+
+    return _parse_month_name(t, today)
+
+
+def try_parse_jalali_month_name(text: str) -> date | None:
+    """The month-name half of :func:`try_parse_jalali`: "27 بهمن 1404",
+    "بهمن 1404", "4th of Esfand", "بهمن ۲۷". Numeric dates are not tried."""
+    if not text:
+        return None
+    t = _to_ascii(text)
+    if not _DIGIT.search(t):
+        return None
+    return _parse_month_name(t, date.today())
+
+
+def _parse_month_name(ascii_text: str, today: date) -> date | None:
+    months = _month_patterns_in(ascii_text)
+    if not months:
+        return None
 
     # "27 بهمن 1404" or "بهمن 27 1404" or "بهمن 1404" (with explicit year)
-    for name, month_num in _MONTH_NAMES.items():
-        pattern = re.compile(
-            r"(?:(\d{1,2})\s+" + re.escape(name) + r"\s+(\d{4}))|"
-            r"(?:" + re.escape(name) + r"\s+(\d{1,2})\s+(\d{4}))|"
-            r"(?:" + re.escape(name) + r"\s+(\d{4}))",
-            re.IGNORECASE,
-        )
-        match = pattern.search(_to_ascii(text))
+    for month_num, (with_year, _day_year, _day_month, _month_day) in months:
+        match = with_year.search(ascii_text)
         if match:
             groups = match.groups()
             if groups[0] and groups[1]:
@@ -106,7 +243,7 @@ def try_parse_jalali(text: str) -> date | None:
                 day_val, year_val = 1, int(groups[4])
             else:
                 continue
-            if year_val in _JALALI_YEAR_RANGE:
+            if _JALALI_YEAR_MIN <= year_val < _JALALI_YEAR_MAX:
                 try:
                     return jalali_to_gregorian(year_val, month_num, day_val)
                 except ValueError:
@@ -115,31 +252,16 @@ def try_parse_jalali(text: str) -> date | None:
     # Month name WITHOUT year: "4th of Esfand", "4 Esfand", "Esfand 4", "بهمن ۲۷"
     # Infer the most likely Jalali year: if the resulting date would be more than
     # 6 months in the future, assume the user meant the previous year.
-    ascii_text = _to_ascii(text)
-    for name, month_num in _MONTH_NAMES.items():
-        # "4th of Esfand", "4 of Esfand", "4 Esfand", "27 بهمن"
-        pat_day_month = re.compile(
-            r"(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?" + re.escape(name) + r"(?:\s|$|[.,;!?])",
-            re.IGNORECASE,
-        )
-        match = pat_day_month.search(ascii_text)
-        if match:
-            day_val = int(match.group(1))
-            result = _resolve_jalali_no_year(current_jalali_year, today_jalali, month_num, day_val)
-            if result is not None:
-                return result
-
-        # "Esfand 4", "Esfand 4th", "بهمن 27"
-        pat_month_day = re.compile(
-            re.escape(name) + r"\s+(\d{1,2})(?:st|nd|rd|th)?(?:\s|$|[.,;!?])",
-            re.IGNORECASE,
-        )
-        match = pat_month_day.search(ascii_text)
-        if match:
-            day_val = int(match.group(1))
-            result = _resolve_jalali_no_year(current_jalali_year, today_jalali, month_num, day_val)
-            if result is not None:
-                return result
+    today_jalali = jdatetime.date.fromgregorian(date=today)
+    current_jalali_year = today_jalali.year
+    for month_num, (_with_year, _day_year, day_month, month_day) in months:
+        for pat in (day_month, month_day):
+            match = pat.search(ascii_text)
+            if match:
+                day_val = int(match.group(1))
+                result = _resolve_jalali_no_year(current_jalali_year, today_jalali, month_num, day_val)
+                if result is not None:
+                    return result
 
     return None
 
@@ -169,70 +291,80 @@ def find_and_replace_jalali_dates(text: str) -> tuple[str, list[tuple[str, date]
     """
     Find all Jalali dates in text, replace them with YYYY-MM-DD Gregorian.
     Returns (new_text, [(original_match, gregorian_date), ...]).
+
+    Each date is replaced where it was found; a match overlapping one taken by
+    an earlier pattern is skipped, and repeated date texts are listed once.
     """
-    if not text:
+    if not text or not _DIGIT.search(text):
         return text, []
 
     replacements: list[tuple[str, date]] = []
-    result = text
+    seen: set[str] = set()
+    spans: list[tuple[int, int, date]] = []
+    taken = bytearray(len(text))
+
+    def claim(start: int, end: int, gd: date) -> None:
+        if any(taken[start:end]):
+            return
+        taken[start:end] = b"\x01" * (end - start)
+        spans.append((start, end, gd))
+        original = text[start:end]
+        if original not in seen:
+            seen.add(original)
+            replacements.append((original, gd))
 
+    # Digit folding is one code point for one, so offsets into ascii_text are
+    # offsets into text.
     ascii_text = _to_ascii(text)
 
-    # Pattern: YYYY/MM/DD or YYYY-MM-DD (Jalali year range)
-    for m in re.finditer(r"\b(1[34]\d{2})[/\-](0?[1-9]|1[0-2])[/\-](0?[1-9]|[12]\d|3[01])\b", ascii_text):
-        try:
-            gd = jalali_to_gregorian(int(m.group(1)), int(m.group(2)), int(m.group(3)))
-            original = text[m.start():m.end()]
-            replacements.append((original, gd))
-            result = result.replace(original, gd.isoformat(), 1)
-        except ValueError:
-            pass
+    if _has_date_separator(ascii_text):
+        # Pattern: YYYY/MM/DD or YYYY-MM-DD (Jalali year range)
+        for m in _JALALI_YMD.finditer(ascii_text):
+            try:
+                gd = jalali_to_gregorian(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+            except ValueError:
+                continue
+            claim(m.start(), m.end(), gd)
 
-    # Pattern: DD/MM/YYYY (day-first Jalali)
-    for m in re.finditer(r"\b(0?[1-9]|[12]\d|3[01])[/\-](0?[1-9]|1[0-2])[/\-](1[34]\d{2})\b", ascii_text):
-        y, mo, d = int(m.group(3)), int(m.group(2)), int(m.group(1))
-        try:
-            gd = jalali_to_gregorian(y, mo, d)
-            original = text[m.start():m.end()]
-            if original not in [r[0] for r in replacements]:
-                replacements.append((original, gd))
-                result = result.replace(original, gd.isoformat(), 1)
-        except ValueError:
-            pass
+        # Pattern: DD/MM/YYYY (day-first Jalali)
+        for m in _JALALI_DMY.finditer(ascii_text):
+            try:
+                gd = jalali_to_gregorian(int(m.group(3)), int(m.group(2)), int(m.group(1)))
+            except ValueError:
+                continue
+            claim(m.start(), m.end(), gd)
 
-    # Month name patterns (with year)
-    for name, month_num in _MONTH_NAMES.items():
-        pattern = re.compile(
-            r"(\d{1,2})\s+" + re.escape(name) + r"\s+(\d{4})",
-            re.IGNORECASE,
-        )
-        for match in pattern.finditer(_to_ascii(text)):
-            d_val, y_val = int(match.group(1)), int(match.group(2))
-            if y_val in _JALALI_YEAR_RANGE:
+    months = _month_patterns_in(ascii_text)
+    if months:
+        # Month name patterns (with year)
+        for month_num, (_with_year, day_year, _day_month, _month_day) in months:
+            for match in day_year.finditer(ascii_text):
                 try:
-                    gd = jalali_to_gregorian(y_val, month_num, d_val)
-                    original = text[match.start():match.end()]
-                    if original not in [r[0] for r in replacements]:
-                        replacements.append((original, gd))
-                        result = result.replace(original, gd.isoformat(), 1)
+                    gd = jalali_to_gregorian(int(match.group(2)), month_num, int(match.group(1)))
                 except ValueError:
-                    pass
-
-    # Month name patterns WITHOUT year: "4th of Esfand", "4 Esfand", "بهمن 27"
-    today_jalali = jdatetime.date.today()
-    current_jalali_year = today_jalali.year
-    for name, month_num in _MONTH_NAMES.items():
-        for pat in [
-            re.compile(r"(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?" + re.escape(name) + r"(?:\s|$|[.,;!?])", re.IGNORECASE),
-            re.compile(re.escape(name) + r"\s+(\d{1,2})(?:st|nd|rd|th)?(?:\s|$|[.,;!?])", re.IGNORECASE),
-        ]:
-            for match in pat.finditer(ascii_text):
-                d_val = int(match.group(1))
-                gd = _resolve_jalali_no_year(current_jalali_year, today_jalali, month_num, d_val)
-                if gd is not None:
-                    original = text[match.start():match.end()].rstrip(" .,;!?")
-                    if original not in [r[0] for r in replacements]:
-                        replacements.append((original, gd))
-                        result = result.replace(original, gd.isoformat(), 1)
-
-    return result, replacements
+                    continue
+                claim(match.start(), match.end(), gd)
+
+        # Month name patterns WITHOUT year: "4th of Esfand", "4 Esfand", "بهمن 27"
+        today_jalali = jdatetime.date.today()
+        current_jalali_year = today_jalali.year
+        for month_num, (_with_year, _day_year, day_month, month_day) in months:
+            for pat in (day_month, month_day):
+                for match in pat.finditer(ascii_text):
+                    d_val = int(match.group(1))
+                    gd = _resolve_jalali_no_year(current_jalali_year, today_jalali, month_num, d_val)
+                    if gd is not None:
+                        # The pattern also consumes the delimiter after the day.
+                        end = match.start() + len(text[match.start():match.end()].rstrip(" .,;!?"))
+                        claim(match.start(), end, gd)
+
+    if not spans:
+        return text, replacements
+    parts: list[str] = []
+    pos = 0
+    for start, end, gd in sorted(spans, key=lambda span: span[0]):
+        parts.append(text[pos:start])
+        parts.append(gd.isoformat())
+        pos = end
+    parts.append(text[pos:])
+    return "".join(parts), replacements
@@ -91,3 +91,9 @@ class TestPeriodForKeyword:
 
     def test_unknown_keyword_returns_none(self):
         assert period_for_keyword("next century") is None
+
+    def test_cached_result_is_not_shared(self):
+        first = period_for_keyword(" This Month ", today=self._today)
+        first.from_date = date(2000, 1, 1)
+        again = period_for_keyword("this month", today=self._today)
+        assert again.from_date == date(2026, 2, 1)
@@ -47,6 +47,33 @@ class TestTrialBalance:
             f"Trial balance mismatch: debits={total_debit}, credits={total_credit}"
         )
 
+    def test_totals_cover_every_page(self, auth_client):
+        _create_txn(auth_client, "2022-07-05", [
+            {"account_code": "1110", "debit": 700000, "credit": 0},
+            {"account_code": "3110", "debit": 0, "credit": 700000},
+        ], "Capital injection")
+        _create_txn(auth_client, "2022-07-10", [
+            {"account_code": "6112", "debit": 300000, "credit": 0},
+            {"account_code": "1110", "debit": 0, "credit": 300000},
+        ], "Rent expense")
+        period = {"from_date": "2022-07-01", "to_date": "2022-07-31"}
+
+        full = auth_client.get("/manager-reports/books/trial-balance", params=period).json()
+        assert full["total"] == 3
+        assert full["totals"] == {
+            "debit_turnover": 1000000,
+            "credit_turnover": 1000000,
+            "debit_balance": 700000,
+            "credit_balance": 700000,
+        }
+
+        resp = auth_client.get("/manager-reports/books/trial-balance", params={**period, "page": 2, "page_size": 1})
+        assert resp.status_code == 200, resp.text
+        data = resp.json()
+        assert data["total"] == 3
+        assert [r["account_code"] for r in data["rows"]] == [full["rows"][1]["account_code"]]
+        assert data["totals"] == full["totals"]
+
 
 class TestAccountLedger:
     """Running balance correctness for individual accounts."""
@@ -68,6 +95,112 @@ class TestAccountLedger:
         assert data["debit_turnover"] >= 500000
         assert data["credit_turnover"] >= 100000
 
+    def test_ledger_opens_with_prior_balance(self, auth_client):
+        _create_txn(auth_client, "2022-08-20", [
+            {"account_code": "1110", "debit": 400000, "credit": 0},
+            {"account_code": "3110", "debit": 0, "credit": 400000},
+        ], "Capital")
+        _create_txn(auth_client, "2022-09-03", [
+            {"account_code": "6112", "debit": 50000, "credit": 0},
+            {"account_code": "1110", "debit": 0, "credit": 50000},
+        ], "Expense")
+        _create_txn(auth_client, "2022-09-08", [
+            {"account_code": "1110", "debit": 20000, "credit": 0},
+            {"account_code": "4110", "debit": 0, "credit": 20000},
+        ], "Sale")
+
+        august = auth_client.get(
+            "/manager-reports/books/account-ledger/1110",
+            params={"from_date": "2022-08-01", "to_date": "2022-08-31"},
+        ).json()
+        opening = august["account"]["balance"]
+        assert opening >= 400000
+
+        resp = auth_client.get(
+            "/manager-reports/books/account-ledger/1110",
+            params={"from_date": "2022-09-01", "to_date": "2022-09-30"},
+        )
+        assert resp.status_code == 200, resp.text
+        data = resp.json()
+        assert data["total"] == 2
+        assert [r["running_balance"] for r in data["items"]] == [opening - 50000, opening - 30000]
+        assert data["account"]["balance"] == opening - 30000
+
+    def test_later_pages_carry_earlier_movement(self, auth_client):
+        _create_txn(auth_client, "2022-10-04", [
+            {"account_code": "1110", "debit": 90000, "credit": 0},
+            {"account_code": "4110", "debit": 0, "credit": 90000},
+        ], "Sale")
+        _create_txn(auth_client, "2022-10-11", [
+            {"account_code": "6112", "debit": 15000, "credit": 0},
+            {"account_code": "1110", "debit": 0, "credit": 15000},
+        ], "Expense")
+        period = {"from_date": "2022-10-01", "to_date": "2022-10-31"}
+
+        full = auth_client.get("/manager-reports/books/account-ledger/1110", params=period).json()
+        resp = auth_client.get(
+            "/manager-reports/books/account-ledger/1110",
+            params={**period, "page": 2, "page_size": 1},
+        )
+        assert resp.status_code == 200, resp.text
+        second = resp.json()["items"]
+        assert len(second) == 1
+        assert second[0]["running_balance"] == full["items"][1]["running_balance"]
+        assert full["items"][1]["running_balance"] - full["items"][0]["running_balance"] == -15000
+
+
+class TestJournalReversal:
+    """Reversing an entry mirrors its lines and persists the reversal."""
+
+    def test_reversal_swaps_debits_and_credits(self, auth_client):
+        src = _create_txn(auth_client, "2022-11-02", [
+            {"account_code": "6112", "debit": 45000, "credit": 0},
+            {"account_code": "1110", "debit": 0, "credit": 45000},
+        ], "Reversible expense")
+
+        resp = auth_client.post(
+            f"/manager-reports/journal/{src['id']}/reverse",
+            params={"reverse_date": "2022-11-03"},
+        )
+        assert resp.status_code == 200, resp.text
+        rev = resp.json()
+        assert rev["description"] == f"Reversal of {src['id']}"
+        assert [(ln["account_code"], ln["debit"], ln["credit"]) for ln in rev["lines"]] == [
+            ("6112", 0, 45000),
+            ("1110", 45000, 0),
+        ]
+        assert rev["total_debit"] == rev["total_credit"] == 45000
+
+        journal = auth_client.get(
+            "/manager-reports/books/general-journal",
+            params={"from_date": "2022-11-03", "to_date": "2022-11-03"},
+        ).json()
+        stored = next(i for i in journal["items"] if i["transaction_id"] == rev["transaction_id"])
+        assert sorted((ln["account_code"], ln["debit"], ln["credit"]) for ln in stored["lines"]) == sorted(
+            (ln["account_code"], ln["debit"], ln["credit"]) for ln in rev["lines"]
+        )
+
+
+class TestGeneralJournalPaging:
+    """The journal total rides on the page rows, and survives an empty page."""
+
+    def test_total_on_partial_and_past_end_pages(self, auth_client):
+        for day in ("2021-05-04", "2021-05-11", "2021-05-18"):
+            _create_txn(auth_client, day, [
+                {"account_code": "6112", "debit": 3000, "credit": 0},
+                {"account_code": "1110", "debit": 0, "credit": 3000},
+            ], "Paged expense")
+        period = {"from_date": "2021-05-01", "to_date": "2021-05-31", "page_size": 2}
+
+        last = auth_client.get("/manager-reports/books/general-journal", params={**period, "page": 2}).json()
+        assert last["total"] == 3
+        assert len(last["items"]) == 1
+        assert last["items"][0]["date"] == "2021-05-04"
+
+        past_end = auth_client.get("/manager-reports/books/general-journal", params={**period, "page": 5}).json()
+        assert past_end["total"] == 3
+        assert past_end["items"] == []
+
 
 class TestBalanceSheetEquation:
     """Assets = Liabilities + Equity (via ledger summary)."""
@@ -143,3 +276,282 @@ class TestPeriodFiltering:
         p = period_for_keyword("last month", today=today)
         assert p.from_date == date(2026, 1, 1)
         assert p.to_date == date(2026, 1, 31)
+
+
+class TestInventoryBalance:
+    """Weighted-average balances from the streamed movement history."""
+
+    def test_balance_per_item(self, auth_client):
+        ids = {}
+        for name in ("Balance Widget", "Balance Bolt", "Balance Unused"):
+            resp = auth_client.post("/manager-reports/inventory/items", json={"name": name, "sku": name.split()[1][:3].upper()})
+            assert resp.status_code == 201, resp.text
+            ids[name] = resp.json()["id"]
+        for item, day, typ, qty, cost in [
+            ("Balance Widget", "2026-01-01", "IN", 10, 100),
+            ("Balance Bolt", "2026-01-02", "IN", 5, 40),
+            ("Balance Widget", "2026-01-03", "IN", 10, 200),
+            ("Balance Widget", "2026-01-04", "OUT", 4, 0),
+            ("Balance Bolt", "2026-02-10", "OUT", 5, 40),
+        ]:
+            resp = auth_client.post("/manager-reports/inventory/movements", json={
+                "item_id": ids[item], "movement_date": day, "movement_type": typ, "quantity": qty, "unit_cost": cost,
+            })
+            assert resp.status_code == 201, resp.text
+
+        resp = auth_client.get("/manager-reports/inventory/balance", params={"to_date": "2026-01-31"})
+        assert resp.status_code == 200, resp.text
+        rows = {r["item_name"]: r for r in resp.json()["rows"]}
+        assert "Balance Unused" not in rows
+        assert rows["Balance Widget"]["on_hand_qty"] == 16
+        assert rows["Balance Widget"]["average_cost"] == 150
+        assert rows["Balance Widget"]["cogs"] == 600
+        assert rows["Balance Widget"]["sku"] == "WID"
+        assert rows["Balance Bolt"]["on_hand_qty"] == 5
+        assert rows["Balance Bolt"]["inventory_value"] == 200
+        totals = resp.json()["totals"]
+        assert totals["inventory_value"] == sum(r["inventory_value"] for r in rows.values())
+        assert totals["cogs"] == sum(r["cogs"] for r in rows.values())
+        assert totals["on_hand_qty"] == pytest.approx(sum(r["on_hand_qty"] for r in rows.values()))
+
+    def test_item_missing_from_metadata_is_left_out(self, auth_client, monkeypatch):
+        from app.services.reporting import inventory_report_service
+
+        ids = {}
+        for name in ("Vanishing Nut", "Staying Nut"):
+            resp = auth_client.post("/manager-reports/inventory/items", json={"name": name})
+            assert resp.status_code == 201, resp.text
+            ids[name] = resp.json()["id"]
+            resp = auth_client.post("/manager-reports/inventory/movements", json={
+                "item_id": ids[name], "movement_date": "2026-03-01", "movement_type": "IN", "quantity": 1, "unit_cost": 10,
+            })
+            assert resp.status_code == 201, resp.text
+
+        fetch = inventory_report_service.inventory_items_by_id
+
+        def without_vanished(db, item_ids):
+            return {k: v for k, v in fetch(db, item_ids).items() if str(k) != ids["Vanishing Nut"]}
+
+        # As if the item were deleted between the movement stream and this read.
+        monkeypatch.setattr(inventory_report_service, "inventory_items_by_id", without_vanished)
+        resp = auth_client.get("/manager-reports/inventory/balance", params={"to_date": "2026-03-31"})
+        assert resp.status_code == 200, resp.text
+        names = {r["item_name"] for r in resp.json()["rows"]}
+        assert "Staying Nut" in names
+        assert "Vanishing Nut" not in names
+
+
+class TestIncomeStatement:
+    """Only revenue and expense accounts reach the income statement."""
+
+    def test_sections_and_net_profit(self, auth_client):
+        _create_txn(auth_client, "2022-03-05", [
+            {"account_code": "1110", "debit": 900000, "credit": 0},
+            {"account_code": "4110", "debit": 0, "credit": 900000},
+        ], "Sales")
+        _create_txn(auth_client, "2022-03-10", [
+            {"account_code": "6112", "debit": 200000, "credit": 0},
+            {"account_code": "6210", "debit": 50000, "credit": 0},
+            {"account_code": "1110", "debit": 0, "credit": 250000},
+        ], "Rent and bank charges")
+
+        resp = auth_client.get("/manager-reports/financial/income-statement", params={
+            "from_date": "2022-03-01", "to_date": "2022-03-31",
+        })
+        assert resp.status_code == 200, resp.text
+        data = resp.json()
+        codes = {
+            item["account_code"]
+            for section in data["sections"].values()
+            for item in section["items"]
+        }
+        assert codes == {"4110", "6112", "6210"}
+        assert data["totals"]["revenue"] == 900000
+        assert data["totals"]["net_profit"] == 650000
+
+
+class TestStatementCache:
+    """Cached statements must follow the ledger, including line-only edits."""
+
+    def test_income_statement_tracks_ledger_changes(self, auth_client):
+        params = {"from_date": "2022-05-01", "to_date": "2022-05-31"}
+
+        def revenue():
+            resp = auth_client.get("/manager-reports/financial/income-statement", params=params)
+            assert resp.status_code == 200, resp.text
+            return resp.json()["totals"]["revenue"]
+
+        base = revenue()
+        assert revenue() == base
+        txn = _create_txn(auth_client, "2022-05-10", [
+            {"account_code": "1110", "debit": 120000, "credit": 0},
+            {"account_code": "4110", "debit": 0, "credit": 120000},
+        ], "Cached sale")
+        assert revenue() == base + 120000
+
+        resp = auth_client.patch(f"/transactions/{txn['id']}", json={"lines": [
+            {"account_code": "1110", "debit": 120000, "credit": 0},
+            {"account_code": "3110", "debit": 0, "credit": 120000},
+        ]})
+        assert resp.status_code == 200, resp.text
+        assert revenue() == base
+
+    def test_line_edit_from_another_process_is_noticed(self, auth_client, db, monkeypatch):
+        from datetime import datetime
+
+        from sqlalchemy import update
+
+        from app.models.transaction import Transaction
+        from app.services.reporting import statement_cache
+
+        params = {"from_date": "2022-06-01", "to_date": "2022-06-30"}
+
+        def revenue():
+            resp = auth_client.get("/manager-reports/financial/income-statement", params=params)
+            assert resp.status_code == 200, resp.text
+            return resp.json()["totals"]["revenue"]
+
+        txn = _create_txn(auth_client, "2022-06-10", [
+            {"account_code": "1110", "debit": 80000, "credit": 0},
+            {"account_code": "4110", "debit": 0, "credit": 80000},
+        ], "Cached sale")
+        # Written a while ago, so the edit below moves max(updated_at) even on
+        # SQLite's one-second timestamps.
+        db.execute(update(Transaction).values(updated_at=datetime(2022, 6, 10)))
+        db.commit()
+        base = revenue()
+
+        # Another worker's write does not move this process's generation.
+        monkeypatch.setattr(statement_cache, "_bump_generation", lambda: None)
+        resp = auth_client.patch(f"/transactions/{txn['id']}", json={"lines": [
+            {"account_code": "1110", "debit": 80000, "credit": 0},
+            {"account_code": "3110", "debit": 0, "credit": 80000},
+        ]})
+        assert resp.status_code == 200, resp.text
+        assert revenue() == base - 80000
+
+    def test_commit_moves_the_generation_again(self, db, make_transaction):
+        from app.services.reporting import statement_cache
+
+        make_transaction([("1110", 5000, 0), ("4110", 0, 5000)])
+        flushed = statement_cache._generation
+        db.commit()
+        assert statement_cache._generation > flushed
+
+
+class TestSalesReports:
+    """Sales reports aggregate and join in SQL rather than per item."""
+
+    def test_blank_names_merge_and_costs_sum(self, auth_client, db):
+        from app.models.invoice import Invoice
+        from app.models.invoice_item import InvoiceItem
+
+        inv = Invoice(number="SBP-1", kind="sales", status="issued",
+                      issue_date=date(2021, 2, 10), due_date=date(2021, 3, 10), amount=0)
+        db.add(inv)
+        db.flush()
+        db.add_all([
+            InvoiceItem(invoice_id=inv.id, product_name="Grouped Gadget", quantity=2, unit_price=500, unit_cost=300, line_total=1000),
+            InvoiceItem(invoice_id=inv.id, product_name="Grouped Gadget", quantity=1, unit_price=600, unit_cost=300, line_total=600),
+            InvoiceItem(invoice_id=inv.id, product_name="  ", quantity=1, unit_price=50, line_total=50),
+            InvoiceItem(invoice_id=inv.id, product_name="", quantity=1, unit_price=70, line_total=70),
+        ])
+        db.commit()
+
+        resp = auth_client.get("/manager-reports/sales/by-product", params={"from_date": "2021-02-01", "to_date": "2021-02-28"})
+        assert resp.status_code == 200, resp.text
+        body = resp.json()
+        rows = {r["product_name"]: r for r in body["rows"]}
+        assert [r["product_name"] for r in body["rows"]] == ["Grouped Gadget", "Unspecified"]
+        assert rows["Grouped Gadget"]["quantity"] == 3
+        assert rows["Grouped Gadget"]["sales_amount"] == 1600
+        assert rows["Grouped Gadget"]["estimated_cost"] == 900
+        assert rows["Unspecified"]["sales_amount"] == 120
+        assert body["totals"]["profit"] == 1720 - 900
+
+    def test_estimated_cost_rounds_each_line_half_away_from_zero(self, auth_client, db):
+        from app.models.invoice import Invoice
+        from app.models.invoice_item import InvoiceItem
+
+        inv = Invoice(number="SBP-HALF", kind="sales", status="issued",
+                      issue_date=date(2021, 4, 10), due_date=date(2021, 5, 10), amount=0)
+        db.add(inv)
+        db.flush()
+        db.add_all([
+            InvoiceItem(invoice_id=inv.id, product_name="Half Cent", quantity=0.5, unit_price=10, unit_cost=5, line_total=5),
+            InvoiceItem(invoice_id=inv.id, product_name="Half Cent", quantity=0.5, unit_price=10, unit_cost=5, line_total=5),
+        ])
+        db.commit()
+
+        resp = auth_client.get("/manager-reports/sales/by-product", params={"from_date": "2021-04-01", "to_date": "2021-04-30"})
+        assert resp.status_code == 200, resp.text
+        rows = {r["product_name"]: r for r in resp.json()["rows"]}
+        # 2.5 rounds to 3 on each line (SQL ROUND), not to 2 as Python's round would.
+        assert rows["Half Cent"]["estimated_cost"] == 6
+
+    def test_by_invoice_names_the_counterparty(self, auth_client, db):
+        from app.models.entity import Entity
+        from app.models.invoice import Invoice
+
+        buyer = Entity(type="client", name="Joined Buyer Ltd")
+        db.add(buyer)
+        db.flush()
+        db.add_all([
+            Invoice(number="BYI-1", kind="sales", status="issued", issue_date=date(2021, 8, 5),
+                    due_date=date(2021, 9, 5), amount=4000, entity_id=buyer.id),
+            Invoice(number="BYI-2", kind="sales", status="draft", issue_date=date(2021, 8, 9),
+                    due_date=date(2021, 9, 9), amount=1500),
+        ])
+        db.commit()
+
+        resp = auth_client.get("/manager-reports/sales/by-invoice", params={"from_date": "2021-08-01", "to_date": "2021-08-31"})
+        assert resp.status_code == 200, resp.text
+        body = resp.json()
+        assert [(r["invoice_number"], r["entity_name"], r["amount"]) for r in body["rows"]] == [
+            ("BYI-2", None, 1500),
+            ("BYI-1", "Joined Buyer Ltd", 4000),
+        ]
+        assert body["totals"] == {"sales_amount": 5500, "count": 2}
+
+    def test_trend_counts_each_invoice_once_per_period(self, auth_client, db):
+        from app.models.invoice import Invoice
+        from app.models.invoice_item import InvoiceItem
+
+        for number, day in (("TR-1", date(2021, 6, 3)), ("TR-2", date(2021, 6, 20)), ("TR-3", date(2021, 7, 2))):
+            inv = Invoice(number=number, kind="sales", status="issued", issue_date=day, due_date=day, amount=0)
+            db.add(inv)
+            db.flush()
+            db.add_all([
+                InvoiceItem(invoice_id=inv.id, product_name="Trend Tea", quantity=2, unit_price=100, line_total=200),
+                InvoiceItem(invoice_id=inv.id, product_name="Trend Tea", quantity=1, unit_price=100, line_total=100),
+            ])
+        db.commit()
+
+        resp = auth_client.get("/manager-reports/sales/trend", params={
+            "from_date": "2021-06-01", "to_date": "2021-07-31", "product_name": "trend tea",
+        })
+        assert resp.status_code == 200, resp.text
+        body = resp.json()
+        assert body["periods"] == [
+            {"period": "2021-06", "quantity": 6.0, "sales_amount": 600, "invoice_count": 2},
+            {"period": "2021-07", "quantity": 3.0, "sales_amount": 300, "invoice_count": 1},
+        ]
+        assert body["totals"] == {"total_quantity": 9.0, "total_sales": 900, "total_invoices": 3}
+
+
+class TestStreamedTransactions:
+    """Streaming in small batches must still load every transaction's lines."""
+
+    def test_lines_loaded_across_batches(self, auth_client, db):
+        from app.services.reporting.repository import transactions_with_lines_between
+
+        for day in ("2021-04-03", "2021-04-07", "2021-04-12", "2021-04-20", "2021-04-25"):
+            _create_txn(auth_client, day, [
+                {"account_code": "1110", "debit": 1000, "credit": 0},
+                {"account_code": "4110", "debit": 0, "credit": 1000},
+            ], "Streamed sale")
+
+        txns = list(transactions_with_lines_between(db, date(2021, 4, 1), date(2021, 4, 30), batch_size=2))
+        assert len(txns) == 5
+        assert [t.date for t in txns] == sorted(t.date for t in txns)
+        assert all(sorted(ln.account.code for ln in t.lines) == ["1110", "4110"] for t in txns)
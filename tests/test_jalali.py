@@ -12,6 +12,7 @@ from app.utils.jalali import (
     gregorian_to_jalali,
     jalali_to_gregorian,
     try_parse_jalali,
+    try_parse_jalali_month_name,
 )
 
 # When tests use month names without a year, the code infers the closest year.
@@ -63,6 +64,21 @@ class TestRoundTrip:
             y, m, day = gregorian_to_jalali(d)
             assert jalali_to_gregorian(y, m, day) == d
 
+    def test_matches_jdatetime_across_two_cycles(self):
+        d = date(1990, 3, 21)
+        while d < date(2056, 3, 21):
+            jd = jdatetime.date.fromgregorian(date=d)
+            assert gregorian_to_jalali(d) == (jd.year, jd.month, jd.day)
+            assert jalali_to_gregorian(jd.year, jd.month, jd.day) == d
+            d = date.fromordinal(d.toordinal() + 1)
+
+    @pytest.mark.parametrize("args", [(1404, 12, 30), (1404, 7, 31), (1404, 13, 1), (0, 1, 1)])
+    def test_invalid_dates_raise_like_jdatetime(self, args):
+        with pytest.raises(ValueError):
+            jdatetime.date(*args)
+        with pytest.raises(ValueError):
+            jalali_to_gregorian(*args)
+
 
 class TestFormatJalali:
     def test_basic(self):
@@ -95,6 +111,9 @@ class TestParseNumeric:
     def test_persian_digits(self):
         assert try_parse_jalali("۱۴۰۴/۱۱/۲۷") == date(2026, 2, 16)
 
+    def test_arabic_indic_digits(self):
+        assert try_parse_jalali("١٤٠٤/١١/٢٧") == date(2026, 2, 16)
+
     @pytest.mark.parametrize("bad", ["1404/13/01", "1404/00/01", "1404/01/32"])
     def test_invalid_dates_return_none(self, bad):
         assert try_parse_jalali(bad) is None
@@ -144,10 +163,20 @@ class TestParseMonthNames:
         expected_year = _expected_year_for_month(11, 27)
         assert result == jalali_to_gregorian(expected_year, 11, 27)
 
+    def test_arabic_letter_spellings(self):
+        assert try_parse_jalali("27 فروردين 1404") == jalali_to_gregorian(1404, 1, 27)
+        assert try_parse_jalali("5 دي 1403") == jalali_to_gregorian(1403, 10, 5)
+
     def test_in_sentence(self):
         result = try_parse_jalali("the date was 4th of Esfand")
         assert result is not None
 
+    def test_month_name_only_variant_skips_numeric_dates(self):
+        assert try_parse_jalali_month_name("27 بهمن 1404") == date(2026, 2, 16)
+        assert try_parse_jalali_month_name("ESFAND 4 1404") == date(2026, 2, 23)
+        assert try_parse_jalali_month_name("1404/11/27") is None
+        assert try_parse_jalali_month_name("sales report for last quarter") is None
+
 
 # ---------------------------------------------------------------------------
 # find_and_replace_jalali_dates
@@ -177,6 +206,19 @@ class TestFindAndReplace:
         assert len(replaced) >= 1
         assert "Esfand" not in new_text or "202" in new_text
 
+    def test_repeated_date_replaced_everywhere_listed_once(self):
+        text = "27/11/1404 and again 27/11/1404"
+        new_text, replaced = find_and_replace_jalali_dates(text)
+        assert new_text == "2026-02-16 and again 2026-02-16"
+        assert replaced == [("27/11/1404", date(2026, 2, 16))]
+
+    def test_month_match_inside_numeric_date_is_ignored(self):
+        # "04 Esfand 1403" runs across the "1404" of the numeric date.
+        text = "27/11/1404 Esfand 1403"
+        new_text, replaced = find_and_replace_jalali_dates(text)
+        assert new_text == "2026-02-16 Esfand 1403"
+        assert replaced == [("27/11/1404", date(2026, 2, 16))]
+
 
 # ---------------------------------------------------------------------------
 # Edge cases
@@ -119,3 +119,45 @@ def test_person_ledger_bank_matches_entity_own_account(db, make_transaction):
     res = OperationsReportService(db).person_running_balance(
         bank.id, "bank", date(2026, 3, 1), date(2026, 3, 31))
     assert len(res.rows) == 1 and res.rows[0].running_balance == 700
+
+
+def test_person_ledger_supplier_runs_over_payable_lines_only(db, make_transaction):
+    from app.services.reporting.operations_report_service import OperationsReportService
+    sup = Entity(name=f"Supplier {uuid.uuid4().hex[:6]}", type="supplier")
+    db.add(sup)
+    db.flush()
+    bought = make_transaction([("6112", 3000, 0), ("2110", 0, 3000)], tx_date=date(2026, 4, 3))
+    paid = make_transaction([("2110", 1000, 0), ("1110", 0, 1000)], tx_date=date(2026, 4, 9))
+    for txn in (bought, paid):
+        db.add(TransactionEntity(transaction_id=txn.id, entity_id=sup.id, role="supplier"))
+    db.flush()
+    res = OperationsReportService(db).person_running_balance(
+        sup.id, "supplier", date(2026, 4, 1), date(2026, 4, 30))
+    assert [(r.debit_effect, r.credit_effect, r.running_balance) for r in res.rows] == [
+        (0, 3000, 3000),
+        (1000, 0, 2000),
+    ]
+    assert res.closing_balance == 2000
+
+
+def test_debtor_aging_buckets_by_age_at_period_end(db, make_transaction):
+    from app.services.reporting.operations_report_service import OperationsReportService
+    cli = Entity(name=f"Client {uuid.uuid4().hex[:6]}", type="client")
+    db.add(cli)
+    db.flush()
+    for day, debit, credit in ((date(2025, 2, 1), 5000, 0), (date(2025, 4, 20), 3000, 0), (date(2025, 5, 25), 0, 1000)):
+        lines = [("1112", debit, 0), ("4110", 0, debit)] if debit else [("1110", credit, 0), ("1112", 0, credit)]
+        txn = make_transaction(lines, tx_date=day)
+        db.add(TransactionEntity(transaction_id=txn.id, entity_id=cli.id, role="client"))
+    # The same party also sells to us: its payable side ages as a creditor.
+    bill = make_transaction([("6112", 2500, 0), ("2110", 0, 2500)], tx_date=date(2025, 5, 10))
+    db.add(TransactionEntity(transaction_id=bill.id, entity_id=cli.id, role="supplier"))
+    db.flush()
+    res = OperationsReportService(db).debtor_creditor(date(2025, 1, 1), date(2025, 5, 31))
+    row = next(r for r in res.debtors if r.entity_id == cli.id)
+    assert (row.current, row.days_31_60, row.days_61_90, row.days_90_plus) == (-1000, 3000, 0, 5000)
+    assert row.total == 7000
+    owed = next(r for r in res.creditors if r.entity_id == cli.id)
+    assert (owed.current, owed.total) == (2500, 2500)
+    assert res.totals["debtors"] == sum(r.total for r in res.debtors)
+    assert [r.total for r in res.debtors] == sorted((r.total for r in res.debtors), reverse=True)
@@ -1,9 +1,23 @@
 """Tests for payment vs receipt intent detection."""
 from __future__ import annotations
 
+from datetime import date, timedelta
+
 import pytest
+from sqlalchemy import event
 
-from app.services.transaction_fee import is_payment_intent
+from app.models.transaction import Transaction
+from app.models.transaction_fee import FeeApplicationStatus, FeeType, TransactionFee, TransactionFeeApplication
+from app.services.transaction_fee import (
+    calculate_total_with_fee,
+    canonical_method_name,
+    extract_payment_method,
+    find_bank_entity_by_name,
+    is_payment_intent,
+    recalculate_current_month_pending_entries,
+    resolve_fee_rule,
+    upsert_fee_rule,
+)
 
 
 def _check(text: str) -> bool:
@@ -41,3 +55,104 @@ class TestReceiptDetection:
 class TestThirdPartyDeposit:
     def test_x_paid_to_our_bank(self):
         assert _check("Nikzade payed to Mellat bank 36M") is False
+
+
+class TestGrossModeSplit:
+    """A statement (gross) amount splits back into base + fee."""
+
+    @pytest.mark.parametrize(
+        "rule_kwargs,gross,base,fee",
+        [
+            ({"fee_type": FeeType.PERCENT, "percent_bps": 100}, 1_010_000, 1_000_000, 10_000),
+            ({"fee_type": FeeType.FLAT, "flat_fee": 5_000}, 105_000, 100_000, 5_000),
+            ({"fee_type": FeeType.HYBRID, "flat_fee": 2_000, "percent_bps": 50, "max_fee": 20_000}, 50_020_000, 50_000_000, 20_000),
+            ({"fee_type": FeeType.FLAT, "flat_fee": 5_000}, 3_000, 0, 3_000),
+        ],
+    )
+    def test_split(self, rule_kwargs, gross, base, fee):
+        calc = calculate_total_with_fee(gross, TransactionFee(**rule_kwargs), amount_mode="gross")
+        assert (calc.base_amount, calc.fee_amount, calc.gross_amount) == (base, fee, gross)
+
+    def test_unreachable_gross_takes_nearest_base(self):
+        rule = TransactionFee(fee_type=FeeType.PERCENT, percent_bps=5_000)
+        # Base 2 grosses to 3 and base 3 to 5; on a tie the lower base wins
+        # and the fee absorbs the difference.
+        calc = calculate_total_with_fee(4, rule, amount_mode="gross")
+        assert (calc.base_amount, calc.fee_amount) == (2, 2)
+
+
+class TestMethodNames:
+    @pytest.mark.parametrize(
+        "raw,expected",
+        [
+            ("کارت‌به‌کارت", "Card-to-Card"),
+            ("  CARD-TO-CARD ", "Card-to-Card"),
+            ("card", "Card-to-Card"),
+            ("Internet Banking", "Online Banking"),
+            ("crypto wallet", "Crypto Wallet"),
+        ],
+    )
+    def test_canonical_name(self, raw, expected):
+        assert canonical_method_name(raw) == expected
+
+    def test_extract_prefers_earlier_method(self):
+        assert extract_payment_method("sent via satna then paya") == "Paya"
+        assert extract_payment_method("paid 5M through the payment gateway") == "Online Banking"
+
+
+class TestLookupMemo:
+    def test_repeat_resolve_skips_name_queries(self, db):
+        rule = upsert_fee_rule(db, method_name="memo wallet", bank_name="Memo Bank", fee_type="flat", flat_fee=700)
+        statements = []
+        listener = lambda *args: statements.append(args[2])  # noqa: E731
+        event.listen(db.get_bind(), "before_cursor_execute", listener)
+        try:
+            method, bank, found = resolve_fee_rule(db, "MEMO WALLET", " memo  bank ")
+        finally:
+            event.remove(db.get_bind(), "before_cursor_execute", listener)
+        assert (method.name, bank.name, found) == ("Memo Wallet", "Memo Bank", rule)
+        assert not any("payment_methods" in s or "entities" in s for s in statements)
+
+    def test_renamed_bank_is_not_served_from_memo(self, db):
+        upsert_fee_rule(db, method_name="paya", bank_name="Old Memo Bank", fee_type="flat", flat_fee=100)
+        bank = find_bank_entity_by_name(db, "old memo bank")
+        bank.name = "New Memo Bank"
+        db.flush()
+        assert find_bank_entity_by_name(db, "Old Memo Bank") is None
+        assert find_bank_entity_by_name(db, "new memo bank") is bank
+
+
+class TestPendingRecalculation:
+    def test_only_this_months_pending_entries_are_recalculated(self, db):
+        old = upsert_fee_rule(db, method_name="recalc wallet", bank_name="Recalc Bank", fee_type="flat", flat_fee=100)
+        month_start = date.today().replace(day=1)
+
+        def pending(tx_date=None, status=FeeApplicationStatus.PENDING):
+            tx = None
+            if tx_date is not None:
+                tx = Transaction(date=tx_date, description="fee recalc")
+                db.add(tx)
+                db.flush()
+            app = TransactionFeeApplication(
+                transaction_id=tx.id if tx else None, method_id=old.method_id, bank_id=old.bank_id,
+                fee_rule_id=old.id, status=status, amount_mode="net", base_amount=10_000, fee_amount=100,
+                gross_amount=10_100, net_amount=10_000,
+            )
+            db.add(app)
+            db.flush()
+            return app
+
+        current = pending(month_start)
+        orphan = pending()
+        last_month = pending(month_start - timedelta(days=1))
+        applied = pending(month_start, status=FeeApplicationStatus.APPLIED)
+        new = upsert_fee_rule(db, method_name="recalc wallet", bank_name="Recalc Bank", fee_type="flat",
+                              flat_fee=250, effective_from=date.today() + timedelta(days=1))
+
+        count = recalculate_current_month_pending_entries(
+            db, method_id=new.method_id, bank_id=new.bank_id, as_of=new.effective_from)
+
+        assert count == 2
+        assert (current.fee_amount, current.fee_rule_id) == (250, new.id)
+        assert (orphan.fee_amount, orphan.gross_amount) == (250, 10_250)
+        assert last_month.fee_amount == applied.fee_amount == 100
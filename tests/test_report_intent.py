@@ -200,3 +200,21 @@ class TestPersianQueries:
         intent = parse_report_intent("ترازنامه ماه قبل", today=_TODAY)
         assert intent is not None
         assert intent.key == "balance_sheet"
+
+
+# ---------------------------------------------------------------------------
+# Memoization
+# ---------------------------------------------------------------------------
+class TestMemoization:
+    def test_results_are_keyed_on_today(self):
+        first = parse_report_intent("balance sheet this month", today=_TODAY)
+        assert parse_report_intent("balance sheet this month", today=_TODAY) is first
+        later = parse_report_intent("balance sheet this month", today=date(2026, 4, 10))
+        assert later.from_date == date(2026, 4, 1)
+        assert first.from_date == date(2026, 2, 1)
+
+    def test_shared_results_are_immutable(self):
+        intent = parse_report_intent("trial balance", today=_TODAY)
+        with pytest.raises(AttributeError):
+            intent.key = "balance_sheet"
+        assert not hasattr(intent, "__dict__")
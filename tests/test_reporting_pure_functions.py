@@ -1,34 +1,116 @@
 from __future__ import annotations
 
-import unittest
+from types import SimpleNamespace
+from unittest import mock
+from uuid import uuid4
+
+import pytest
 
 from app.models.inventory import InventoryMovementType
+from app.services.reporting import inventory_report_service
 from app.services.reporting.common import ASSET, LIABILITY, REVENUE, balance_from_turnovers
-from app.services.reporting.financial_statement_service import classify_cash_flow_activity
-from app.services.reporting.inventory_report_service import ItemAccumulator, apply_inventory_movement
-
-
-class ReportingPureFunctionTests(unittest.TestCase):
-    def test_balance_from_turnovers_by_account_nature(self):
-        self.assertEqual(balance_from_turnovers(ASSET, 1000, 300), 700)
-        self.assertEqual(balance_from_turnovers(LIABILITY, 1000, 300), -700)
-        self.assertEqual(balance_from_turnovers(REVENUE, 100, 450), 350)
-
-    def test_cash_flow_classifier(self):
-        self.assertEqual(classify_cash_flow_activity(["1210"], [ASSET]), "investing")
-        self.assertEqual(classify_cash_flow_activity(["3110"], [LIABILITY]), "financing")
-        self.assertEqual(classify_cash_flow_activity(["6110"], [REVENUE]), "operating")
-
-    def test_weighted_average_inventory(self):
-        acc = ItemAccumulator()
-        apply_inventory_movement(acc, InventoryMovementType.IN.value, 10, 100)
-        apply_inventory_movement(acc, InventoryMovementType.IN.value, 10, 200)
-        self.assertAlmostEqual(acc.on_hand, 20.0)
-        self.assertEqual(acc.avg_cost, 150)
-        apply_inventory_movement(acc, InventoryMovementType.OUT.value, 4, 0)
-        self.assertAlmostEqual(acc.on_hand, 16.0)
-        self.assertEqual(acc.cogs, 600)
-
-
-if __name__ == "__main__":
-    unittest.main()
+from app.services.reporting.financial_statement_service import (
+    _build_section_tree,
+    _sort_for_tree,
+    classify_cash_flow_activity,
+)
+from app.services.reporting.inventory_report_service import (
+    ItemAccumulator,
+    accumulate_movements,
+    apply_inventory_movement,
+)
+
+
+@pytest.mark.parametrize(
+    "nature,debit,credit,expected",
+    [
+        (ASSET, 1000, 300, 700),
+        (LIABILITY, 1000, 300, -700),
+        (REVENUE, 100, 450, 350),
+    ],
+)
+def test_balance_from_turnovers_by_account_nature(nature, debit, credit, expected):
+    assert balance_from_turnovers(nature, debit, credit) == expected
+
+
+@pytest.mark.parametrize(
+    "code,nature,expected",
+    [
+        ("1210", ASSET, "investing"),
+        ("3110", LIABILITY, "financing"),
+        ("6110", REVENUE, "operating"),
+    ],
+)
+def test_cash_flow_classifier(code, nature, expected):
+    assert classify_cash_flow_activity([code], [nature]) == expected
+
+
+@pytest.mark.parametrize("code,expected", [("1210", "investing"), ("3110", "financing")])
+def test_cash_flow_classifier_skips_types_on_code_match(code, expected):
+    def exploding_types():
+        raise AssertionError("account types should not be consumed")
+        yield  # pragma: no cover
+
+    assert classify_cash_flow_activity([code], exploding_types()) == expected
+
+
+def test_section_tree_prunes_zero_foreign_subtrees():
+    def account(code, parent=None):
+        return SimpleNamespace(id=uuid4(), code=code, name=code, parent_id=parent.id if parent else None)
+
+    memo = account("91")
+    memo_child = account("1190", memo)  # asset code parked under a memo group
+    funded_memo = account("92")
+    funded_child = account("1191", funded_memo)
+    cash = account("1110")
+    accounts = _sort_for_tree([memo, memo_child, funded_memo, funded_child, cash])
+    totals = {funded_memo.id: 50, funded_child.id: 50}
+
+    roots = _build_section_tree(accounts, totals, ASSET)
+    assert [n.account_code for n in roots] == ["1110", "92"]
+    assert [n.account_code for n in roots[1].children] == ["1191"]
+
+
+def test_weighted_average_inventory():
+    acc = ItemAccumulator()
+    apply_inventory_movement(acc, InventoryMovementType.IN.value, 10, 100)
+    apply_inventory_movement(acc, InventoryMovementType.IN.value, 10, 200)
+    assert acc.on_hand == pytest.approx(20.0, abs=1e-7)
+    assert acc.avg_cost == 150
+    apply_inventory_movement(acc, InventoryMovementType.OUT.value, 4, 0)
+    assert acc.on_hand == pytest.approx(16.0, abs=1e-7)
+    assert acc.cogs == 600
+
+
+_IN, _OUT, _ADJ = (t.value for t in InventoryMovementType)
+_MOVEMENTS = [
+    # item 0: plain running sum
+    (0, _IN, 10, 100),
+    (0, _OUT, 4, 120),
+    (0, _ADJ, 2, 90),
+    # item 1: zero-cost OUT falls back to the average
+    (1, _IN, 10, 100),
+    (1, _IN, 10, 200),
+    (1, _OUT, 4, 0),
+    # item 2: oversold, on-hand clamps at zero
+    (2, _IN, 1.5, 300),
+    (2, _OUT, 3, 300),
+    (2, _IN, 0.25, 80),
+    # item 0 again, interleaved, plus an ignored zero-quantity row
+    (0, _OUT, 8, 100),
+    (0, _IN, 0, 999),
+]
+
+
+# Run the kernel path uncompiled too, so it is checked with or without Numba.
+@pytest.mark.parametrize("kernel", [None, inventory_report_service._replay_kernel], ids=["python", "kernel"])
+def test_accumulate_movements_matches_sequential_replay(kernel):
+    item_idx, types, qtys, costs = (list(col) for col in zip(*_MOVEMENTS, strict=True))
+    expected = [ItemAccumulator() for _ in range(3)]
+    for i, t, q, c in _MOVEMENTS:
+        apply_inventory_movement(expected[i], t, q, c)
+
+    with mock.patch.object(inventory_report_service, "_replay_kernel_jit", kernel):
+        got = accumulate_movements(item_idx, types, [float(q) for q in qtys], costs, 3)
+        assert got == expected
+        assert accumulate_movements([], [], [], [], 2) == [ItemAccumulator(), ItemAccumulator()]
@@ -192,6 +192,21 @@ class TestImportTransactions:
         assert data["imported"] == 2
         assert len(data["ids"]) == 2
 
+    def test_import_rejects_unknown_account(self, auth_client):
+        resp = auth_client.post("/transactions/import", json={
+            "transactions": [
+                {
+                    "date": "2026-01-12",
+                    "lines": [
+                        {"account_code": "1110", "debit": 5000, "credit": 0},
+                        {"account_code": " 9999 ", "debit": 0, "credit": 5000},
+                    ],
+                },
+            ]
+        })
+        assert resp.status_code == 400
+        assert resp.json()["detail"] == "Account not found: 9999"
+
     def test_import_rejects_negative(self, auth_client):
         resp = auth_client.post("/transactions/import", json={
             "transactions": [